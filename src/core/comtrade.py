@@ -2,18 +2,53 @@
 
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import duckdb
 import pandas as pd
+import pyarrow as pa
 
 from core.edizm import load_edizm_mapping
-from core.normalization_rules import add_tnved_columns
+from core.normalization_rules import TNVED_DERIVED_LEVELS, TNVED_LENGTH
 from core.reference_tables import load_partner_mapping
 from core.schema import EXPECTED_SCHEMA
 
 logger = logging.getLogger(__name__)
 
+# Rows per Arrow record batch pulled from the Comtrade query.
+COMTRADE_FETCH_BATCH_ROWS = 1_000_000
+# SQL counterpart of normalize_tnved_code: right-pad with zeros or truncate
+# to TNVED_LENGTH; the derived TNVED2..8 columns are prefixes of it.
+COMTRADE_TNVED_SQL = f"rpad(trim(cmdCode), {TNVED_LENGTH}, '0')"
+
+
+def _fetch_comtrade_frame(
+    conn: duckdb.DuckDBPyConnection,
+    query: str,
+    params: Optional[list] = None,
+) -> pd.DataFrame:
+    """
+    Fetch the Comtrade query as a stream of Arrow record batches.
+    """
+    result = conn.execute(query, params)
+    if hasattr(result, "to_arrow_reader"):
+        reader = result.to_arrow_reader(COMTRADE_FETCH_BATCH_ROWS)
+    else:
+        reader = result.fetch_record_batch(COMTRADE_FETCH_BATCH_ROWS)
+
+    batches = list(reader)
+    if not batches:
+        return pd.DataFrame()
+
+    table = pa.Table.from_batches(batches)
+    del batches
+    return table.to_pandas(
+        date_as_object=False,
+        coerce_temporal_nanoseconds=True,
+        split_blocks=True,
+        self_destruct=True,
+    )
+
 
 def load_and_transform_comtrade(
     comtrade_db_path: Path,
@@ -72,7 +107,6 @@ def load_and_transform_comtrade(
         except Exception as e:
             logger.warning(f"Could not describe comtrade_data table: {e}")
 
-        # Build query with safe formatting (M49 codes are always integers, so safe to format)
         # Try to include qtyCode if it exists in the table
         try:
             # Check if qtyCode column exists
@@ -84,10 +118,41 @@ def load_and_transform_comtrade(
             has_qty_code = False
             logger.info("qtyCode column not found in comtrade_data table, using qtyUnitCode/altQtyUnitCode")
 
+        # M49 -> ISO2 and unit code -> abbreviation lookups are joined in the
+        # query instead of per-row pandas maps
+        conn.register('partner_iso2', pd.DataFrame({
+            'm49': list(partner_mapping.keys()),
+            'iso2': list(partner_mapping.values()),
+        }))
+        conn.register('edizm_abbr', pd.DataFrame({
+            'code': list(edizm_mapping.keys()),
+            'abbr': list(edizm_mapping.values()),
+        }))
+
+        # Choose the supplementary quantity (KOL) and its unit code (EDIZM_CODE).
+        # IMPORTANT:
+        # - qtyUnitCode is the PRIMARY unit CODE (usually weight in kg, code 8)
+        # - qty is the PRIMARY quantity VALUES (weight values)
+        # - altQtyUnitCode is the ALTERNATIVE/SUPPLEMENTARY unit CODE (what we need for EDIZM_CODE)
+        # - altQty is the ALTERNATIVE/SUPPLEMENTARY quantity VALUES (what we need for KOL)
+        # - qtyCode may exist as an additional source of unit CODE information
+        #
+        # Logic priority (code and values are chosen independently):
+        # 1. altQtyUnitCode (CODE) and altQty (VALUES) - the supplementary unit we want
+        # 2. qtyCode (CODE) if it exists and is not kg/code 8
+        # 3. qtyUnitCode (CODE) and qty (VALUES) as a fallback (but this is weight, not ideal)
+        if has_qty_code:
+            edizm_code_sql = "COALESCE(altQtyUnitCode, CASE WHEN qtyCode <> 8 THEN qtyCode END, qtyUnitCode)"
+        else:
+            edizm_code_sql = "COALESCE(altQtyUnitCode, qtyUnitCode)"
+
         query_parts = ["SELECT"]
         query_parts.append("    period AS PERIOD,")
         query_parts.append("    reporterCode AS STRANA_CODE,")
-        query_parts.append("    cmdCode AS TNVED,")
+        query_parts.append("    upper(partner_iso2.iso2) AS STRANA,")
+        query_parts.append(f"    {COMTRADE_TNVED_SQL} AS TNVED,")
+        for level in TNVED_DERIVED_LEVELS:
+            query_parts.append(f"    left({COMTRADE_TNVED_SQL}, {level}) AS TNVED{level},")
         query_parts.append("    CASE flowCode WHEN 'M' THEN 'ЭК' WHEN 'X' THEN 'ИМ' WHEN 'ЭК' THEN 'ЭК' WHEN 'ИМ' THEN 'ИМ' END AS NAPR,")
         query_parts.append("    qtyUnitCode,")
         query_parts.append("    altQtyUnitCode,")
@@ -96,31 +161,33 @@ def load_and_transform_comtrade(
         query_parts.append("    primaryValue AS STOIM,")
         query_parts.append("    netWgt AS NETTO,")
         query_parts.append("    qty,")
-        query_parts.append("    altQty")
+        query_parts.append("    altQty,")
+        query_parts.append(f"    {edizm_code_sql} AS EDIZM_CODE,")
+        query_parts.append("    COALESCE(altQty, qty) AS KOL,")
+        query_parts.append("    COALESCE(edizm_abbr.abbr, 'N/A') AS EDIZM")
         query_parts.append("FROM comtrade_data")
+        query_parts.append("LEFT JOIN partner_iso2 ON partner_iso2.m49 = comtrade_data.reporterCode")
+        query_parts.append(f"LEFT JOIN edizm_abbr ON edizm_abbr.code = {edizm_code_sql}")
 
+        # Filter values are bound as parameters, never formatted into the SQL text
         where_clauses = []
+        params = []
 
         if exclude_m49_codes:
-            # M49 codes are always integers, safe to format directly
-            # Validate all codes are integers for safety
-            if not all(isinstance(code, int) for code in exclude_m49_codes):
-                raise ValueError("All exclude_m49_codes must be integers")
-            codes_str = ', '.join(map(str, exclude_m49_codes))
-            where_clauses.append(f"reporterCode NOT IN ({codes_str})")
+            where_clauses.append("NOT list_contains(?, reporterCode)")
+            params.append(exclude_m49_codes)
 
         if start_year:
             logger.info(f"Applying start_year filter to Comtrade data: year >= {start_year}")
-            if not isinstance(start_year, int):
-                raise ValueError("start_year must be an integer")
-            where_clauses.append(f"refYear >= {start_year}")
+            where_clauses.append("refYear >= ?")
+            params.append(start_year)
 
         if where_clauses:
             query_parts.append("WHERE " + " AND ".join(where_clauses))
 
         query = "\n".join(query_parts)
         logger.info(f"Executing Comtrade query...")
-        comtrade_df = conn.execute(query).fetchdf()
+        comtrade_df = _fetch_comtrade_frame(conn, query, params)
     except Exception as e:
         logger.error(f"Failed to query Comtrade data: {e}")
         return pd.DataFrame()
@@ -134,129 +201,37 @@ def load_and_transform_comtrade(
 
     logger.info(f"Query returned {len(comtrade_df)} rows from Comtrade DB.")
 
-    # Post-processing transformations
+    # Post-processing: the unit columns (EDIZM_CODE, KOL, EDIZM) are already
+    # chosen by the query; only the diagnostics are computed here.
     logger.info("Transforming Comtrade data...")
 
-    # Choose the supplementary quantity (KOL) and its unit code (EDIZM_CODE).
-    # IMPORTANT:
-    # - qtyUnitCode is the PRIMARY unit CODE (usually weight in kg, code 8)
-    # - qty is the PRIMARY quantity VALUES (weight values)
-    # - altQtyUnitCode is the ALTERNATIVE/SUPPLEMENTARY unit CODE (what we need for EDIZM_CODE)
-    # - altQty is the ALTERNATIVE/SUPPLEMENTARY quantity VALUES (what we need for KOL)
-    # - qtyCode may exist as an additional source of unit CODE information
-    #
-    # Logic priority:
-    # 1. Use altQtyUnitCode (CODE) and altQty (VALUES) if available - this is the supplementary unit we want
-    # 2. If altQtyUnitCode is missing, check qtyCode (if it exists and is not kg/code 8) - use qtyCode for CODE and qty for VALUES
-    # 3. Fallback to qtyUnitCode (CODE) and qty (VALUES) only if no alternative is available (but this is weight, not ideal)
-
-    # Initialize EDIZM_CODE and KOL columns
-    comtrade_df['EDIZM_CODE'] = None
-    comtrade_df['KOL'] = None
-
-    # Check if qtyCode column exists (may contain unit CODE information)
-    has_qty_code = 'qtyCode' in comtrade_df.columns
-
-    if 'altQtyUnitCode' in comtrade_df.columns and 'altQty' in comtrade_df.columns:
-        # Priority 1: Use altQtyUnitCode (CODE) and altQty (VALUES) - this is the supplementary unit
-        # altQtyUnitCode is the CODE of the supplementary unit
-        # altQty is the VALUES in that supplementary unit
-        # They can be independent - if we have the code, use it even if values are missing
-        has_alt_code = comtrade_df['altQtyUnitCode'].notna()
-        has_alt_values = comtrade_df['altQty'].notna()
-
-        # Use altQtyUnitCode for EDIZM_CODE (unit code) if available
-        comtrade_df.loc[has_alt_code, 'EDIZM_CODE'] = comtrade_df.loc[has_alt_code, 'altQtyUnitCode']
-        # Use altQty for KOL (values) if available
-        comtrade_df.loc[has_alt_values, 'KOL'] = comtrade_df.loc[has_alt_values, 'altQty']
-
-        # Priority 2: If altQtyUnitCode is missing, check qtyCode (if available and not kg)
-        # Use qtyCode for EDIZM_CODE (unit code) and qty for KOL (values)
-        missing_alt_code = ~has_alt_code
-        if has_qty_code:
-            # Use qtyCode (CODE) if it exists, is not NULL, and is not 8 (kg)
-            # Only use if EDIZM_CODE is still missing (altQtyUnitCode was not available)
-            # Use qty (VALUES) for KOL if KOL is still missing
-            qty_code_available = (
-                missing_alt_code &
-                comtrade_df['qtyCode'].notna() &
-                (comtrade_df['qtyCode'] != 8)
-            )
-            comtrade_df.loc[qty_code_available, 'EDIZM_CODE'] = comtrade_df.loc[qty_code_available, 'qtyCode']
-
-            # Use qty for KOL if KOL is still missing
-            missing_kol = comtrade_df['KOL'].isna() & comtrade_df['qty'].notna()
-            comtrade_df.loc[missing_kol, 'KOL'] = comtrade_df.loc[missing_kol, 'qty']
-            missing_alt_code = missing_alt_code & ~qty_code_available
-
-        # Priority 3: Fallback to qtyUnitCode (CODE) and qty (VALUES) - but this is weight, not ideal
-        # Only use if EDIZM_CODE is still missing
-        missing_edizm_code = comtrade_df['EDIZM_CODE'].isna()
-        fallback_mask = missing_edizm_code & comtrade_df['qtyUnitCode'].notna()
-        comtrade_df.loc[fallback_mask, 'EDIZM_CODE'] = comtrade_df.loc[fallback_mask, 'qtyUnitCode']
-
-        # Use qty for KOL if KOL is still missing
-        missing_kol = comtrade_df['KOL'].isna() & comtrade_df['qty'].notna()
-        comtrade_df.loc[missing_kol, 'KOL'] = comtrade_df.loc[missing_kol, 'qty']
-
-        # Log statistics
-        logger.info(f"Unit mapping statistics:")
-        logger.info(f"  - Using altQtyUnitCode (CODE): {has_alt_code.sum()}")
-        logger.info(f"  - Using altQty (VALUES): {has_alt_values.sum()}")
-        if has_qty_code:
-            qty_code_used = missing_alt_code & comtrade_df['qtyCode'].notna() & (comtrade_df['qtyCode'] != 8)
-            logger.info(f"  - Using qtyCode (CODE) where altQtyUnitCode missing: {qty_code_used.sum()}")
-        logger.info(f"  - Using qtyUnitCode (CODE) as fallback: {fallback_mask.sum()}")
-        logger.info(f"  - Using qty (VALUES) where altQty missing: {missing_kol.sum()}")
-        logger.info(f"  - Missing EDIZM_CODE: {comtrade_df['EDIZM_CODE'].isna().sum()}")
-        logger.info(f"  - Missing KOL: {comtrade_df['KOL'].isna().sum()}")
-
-        # Diagnostic: Check for code 37 (Becquerels)
-        code_37_mask = comtrade_df['altQtyUnitCode'] == 37
-        if code_37_mask.any():
-            logger.info(f"  - Found {code_37_mask.sum()} rows with altQtyUnitCode = 37 (Becquerels)")
-            logger.info(f"  - Of these, {comtrade_df.loc[code_37_mask, 'EDIZM_CODE'].notna().sum()} have EDIZM_CODE set")
+    has_alt_code = comtrade_df['altQtyUnitCode'].notna()
+    has_alt_values = comtrade_df['altQty'].notna()
+    if has_qty_code:
+        qty_code_used = ~has_alt_code & comtrade_df['qtyCode'].notna() & (comtrade_df['qtyCode'] != 8)
     else:
-        logger.warning("altQtyUnitCode or altQty not found in Comtrade data.")
-        # If altQtyUnitCode is not available, try qtyCode first
-        if has_qty_code:
-            # Use qtyCode (CODE) if it exists and is not 8 (kg)
-            # Use qty (VALUES) for KOL
-            qty_code_available = (
-                comtrade_df['qtyCode'].notna() &
-                (comtrade_df['qtyCode'] != 8) &
-                comtrade_df['qty'].notna()
-            )
-            comtrade_df.loc[qty_code_available, 'EDIZM_CODE'] = comtrade_df.loc[qty_code_available, 'qtyCode']
-            comtrade_df.loc[qty_code_available, 'KOL'] = comtrade_df.loc[qty_code_available, 'qty']
-            # For remaining rows, use qtyUnitCode (CODE) and qty (VALUES) as fallback
-            remaining_mask = ~qty_code_available & comtrade_df['qty'].notna()
-            comtrade_df.loc[remaining_mask, 'EDIZM_CODE'] = comtrade_df.loc[remaining_mask, 'qtyUnitCode']
-            comtrade_df.loc[remaining_mask, 'KOL'] = comtrade_df.loc[remaining_mask, 'qty']
-            logger.info(f"  - Using qtyCode (CODE) + qty (VALUES): {qty_code_available.sum()}")
-            logger.info(f"  - Using qtyUnitCode (CODE) + qty (VALUES) as fallback: {remaining_mask.sum()}")
-        else:
-            # Last resort: use qtyUnitCode (CODE) and qty (VALUES) - but this is weight
-            comtrade_df['EDIZM_CODE'] = comtrade_df['qtyUnitCode']
-            comtrade_df['KOL'] = comtrade_df['qty']
-            logger.warning("  - Using qtyUnitCode (CODE) + qty (VALUES) as last resort (this is weight, not ideal)")
-
-    comtrade_df['STRANA'] = comtrade_df['STRANA_CODE'].map(partner_mapping)
-
-    # Ensure STRANA is uppercase for consistency
-    comtrade_df['STRANA'] = comtrade_df['STRANA'].str.upper()
-
-    # Convert EDIZM_CODE to int for proper mapping (edizm_mapping uses int keys)
-    # Handle NaN values - convert to int only for non-null values
-    # First convert to float, then to Int64 to handle NaN properly
-    comtrade_df['EDIZM_CODE_int'] = pd.to_numeric(comtrade_df['EDIZM_CODE'], errors='coerce').astype('Int64')
-
-    # Map EDIZM_CODE (int) to EDIZM (string abbreviation like "Bq")
-    comtrade_df['EDIZM'] = comtrade_df['EDIZM_CODE_int'].map(edizm_mapping)
-    comtrade_df.fillna({'EDIZM': 'N/A'}, inplace=True)
+        qty_code_used = pd.Series(False, index=comtrade_df.index)
+    fallback_mask = ~has_alt_code & ~qty_code_used & comtrade_df['qtyUnitCode'].notna()
+    qty_values_used = ~has_alt_values & comtrade_df['qty'].notna()
+
+    logger.info(f"Unit mapping statistics:")
+    logger.info(f"  - Using altQtyUnitCode (CODE): {has_alt_code.sum()}")
+    logger.info(f"  - Using altQty (VALUES): {has_alt_values.sum()}")
+    if has_qty_code:
+        logger.info(f"  - Using qtyCode (CODE) where altQtyUnitCode missing: {qty_code_used.sum()}")
+    logger.info(f"  - Using qtyUnitCode (CODE) as fallback: {fallback_mask.sum()}")
+    logger.info(f"  - Using qty (VALUES) where altQty missing: {qty_values_used.sum()}")
+    logger.info(f"  - Missing EDIZM_CODE: {comtrade_df['EDIZM_CODE'].isna().sum()}")
+    logger.info(f"  - Missing KOL: {comtrade_df['KOL'].isna().sum()}")
+
+    # Diagnostic: Check for code 37 (Becquerels)
+    code_37_mask = comtrade_df['altQtyUnitCode'] == 37
+    if code_37_mask.any():
+        logger.info(f"  - Found {code_37_mask.sum()} rows with altQtyUnitCode = 37 (Becquerels)")
+        logger.info(f"  - Of these, {comtrade_df.loc[code_37_mask, 'EDIZM_CODE'].notna().sum()} have EDIZM_CODE set")
 
     # Diagnostic: Check if code 37 was mapped to "Bq"
-    code_37_mask = comtrade_df['EDIZM_CODE_int'] == 37
+    code_37_mask = comtrade_df['EDIZM_CODE'] == 37
     if code_37_mask.any():
         code_37_count = code_37_mask.sum()
         code_37_edizm = comtrade_df.loc[code_37_mask, 'EDIZM'].unique()
@@ -266,9 +241,6 @@ def load_and_transform_comtrade(
             bq_count = (comtrade_df.loc[code_37_mask, 'EDIZM'].isin(['Bq', 'BQ', 'bq'])).sum()
             logger.info(f"  - Of these, {bq_count} rows have EDIZM = 'Bq'")
 
-    # Drop temporary column
-    comtrade_df.drop(columns=['EDIZM_CODE_int'], inplace=True)
-
     null_strana_count = comtrade_df['STRANA'].isnull().sum()
     if null_strana_count > 0:
         logger.warning(f"Found {null_strana_count} rows with reporter codes that could not be mapped to ISO2 codes. These will be dropped.")
@@ -288,8 +260,6 @@ def load_and_transform_comtrade(
 
     comtrade_df['EDIZM_ISO'] = None
 
-    comtrade_df = add_tnved_columns(comtrade_df)
-
     # Ensure data types match the expected schema
     for col, expected_type in EXPECTED_SCHEMA.items():
         if col in comtrade_df.columns and str(comtrade_df[col].dtype) != expected_type:
@@ -1,4 +1,4 @@
-"""DuckDB writing helpers: atomic chunked save with Windows/YandexDisk retries."""
+"""DuckDB writing helpers: atomic save with Windows/YandexDisk retries."""
 
 import gc
 import logging
@@ -8,7 +8,7 @@ import tempfile
 import time
 import uuid
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Optional
 
 import duckdb
 import pandas as pd
@@ -88,15 +88,28 @@ def _duckdb_build_path(output_path: Path) -> Path:
     return base_dir / f"{output_path.stem}.{uuid.uuid4().hex}{output_path.suffix}"
 
 
-def save_to_duckdb(df: pd.DataFrame, output_path: Path, table_name: str = 'unified_trade_data', chunk_size: int = 100000):
+def save_to_duckdb(
+    df: pd.DataFrame,
+    output_path: Path,
+    table_name: str = 'unified_trade_data',
+    chunk_size: int = 100000,
+    order_by: Optional[List[str]] = None,
+    post_write: Optional[Callable[[duckdb.DuckDBPyConnection], None]] = None,
+):
     """
-    Save DataFrame to DuckDB database in chunks to conserve memory.
+    Save DataFrame to DuckDB database with a single streaming CREATE TABLE AS.
 
     Args:
         df: DataFrame to save
         output_path: Path to DuckDB file
         table_name: Name of the table in database
-        chunk_size: Number of rows to write per chunk
+        chunk_size: Kept for backward compatibility; DuckDB scans the
+            registered frame vector by vector, so no manual chunking is done
+        order_by: Optional columns to sort by inside the CREATE TABLE AS,
+            so the rows are stored in that order without a pandas sort
+        post_write: Optional callback that receives the open build connection
+            after the main table is written, so further tables and views go
+            into the same file before it is checkpointed and copied
     """
     logger.info(f"Saving merged data to DuckDB: {output_path}")
 
@@ -127,49 +140,46 @@ def save_to_duckdb(df: pd.DataFrame, output_path: Path, table_name: str = 'unifi
             # Convert to datetime and normalize to remove time (set to 00:00:00)
             df['PERIOD'] = pd.to_datetime(df['PERIOD'], errors='coerce').dt.normalize()
 
-        # Create the table and insert the first chunk
+        # One CREATE TABLE AS over the registered frame: DuckDB scans the
+        # pandas columns in vectors in parallel, so there is no need to slice,
+        # copy and re-register the frame chunk by chunk.
         # Explicitly cast PERIOD to DATE in DuckDB to ensure no time component
-        first_chunk = df.iloc[:chunk_size]
-        conn.register('first_chunk_df', first_chunk)
-        if 'PERIOD' in first_chunk.columns:
+        # Categorical columns would be registered as ENUM; they are cast back
+        # to VARCHAR so the table schema does not depend on in-memory dtypes
+        # (DuckDB dictionary-compresses low-cardinality VARCHAR on disk anyway).
+        conn.register('merged_df', df)
+        categorical_columns = [
+            col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)
+        ]
+        replace_clause = ""
+        if categorical_columns:
+            replacements = ", ".join(
+                f'CAST("{col}" AS VARCHAR) AS "{col}"' for col in categorical_columns
+            )
+            replace_clause = f" REPLACE ({replacements})"
+        order_clause = ""
+        if order_by:
+            order_clause = " ORDER BY " + ", ".join(f'"{col}"' for col in order_by)
+        if 'PERIOD' in df.columns:
             conn.execute(f"""
                 CREATE TABLE {table_name} AS
                 SELECT
-                    * EXCLUDE (PERIOD),
+                    * EXCLUDE (PERIOD){replace_clause},
                     CAST(PERIOD AS DATE) AS PERIOD
-                FROM first_chunk_df
+                FROM merged_df{order_clause}
             """)
+            logger.info(f"  ... PERIOD column saved as DATE type (no time component)")
         else:
-            conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM first_chunk_df")
-        conn.unregister('first_chunk_df')
-        logger.info(f"  ... created table and inserted first {len(first_chunk):,} rows")
-        logger.info(f"  ... PERIOD column saved as DATE type (no time component)")
-
-        # Insert the rest of the data in chunks using the efficient append method
-        for i in range(chunk_size, len(df), chunk_size):
-            chunk = df.iloc[i:i + chunk_size].copy()  # Explicit copy to avoid SettingWithCopyWarning
-            # Ensure PERIOD is normalized before appending
-            if 'PERIOD' in chunk.columns:
-                chunk['PERIOD'] = pd.to_datetime(chunk['PERIOD'], errors='coerce').dt.normalize()
-            # Use INSERT with explicit DATE cast for PERIOD to ensure no time component
-            if 'PERIOD' in chunk.columns:
-                conn.register('chunk_df', chunk)
-                conn.execute(f"""
-                    INSERT INTO {table_name}
-                    SELECT
-                        * EXCLUDE (PERIOD),
-                        CAST(PERIOD AS DATE) AS PERIOD
-                    FROM chunk_df
-                """)
-                conn.unregister('chunk_df')
-            else:
-                conn.append(table_name, chunk)
-            logger.info(f"  ... inserted {i + len(chunk):,} / {len(df):,} rows")
+            conn.execute(f"CREATE TABLE {table_name} AS SELECT *{replace_clause} FROM merged_df{order_clause}")
+        conn.unregister('merged_df')
 
         # Get row count for verification
         result = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()
         row_count = result[0]
 
+        if post_write is not None:
+            post_write(conn)
+
         # Flush WAL contents into the main DB before copying it to a synced
         # folder. On Windows, the WAL sidecar can remain briefly locked even
         # after close, so cleanup below is best-effort.
@@ -1,6 +1,5 @@
 """EDIZM reference loading helpers."""
 
-import json
 import logging
 from pathlib import Path
 from typing import Dict
@@ -15,6 +14,7 @@ from core.normalization_rules import (
     resolve_edizm_records,
     standardize_edizm_columns,
 )
+from core.reference_tables import read_json_file
 
 logger = logging.getLogger(__name__)
 
@@ -26,8 +26,7 @@ def load_edizm_mapping(project_root: Path) -> Dict[int, str]:
         logger.error(f"Edizm mapping file not found at {mapping_file}")
         return {}
 
-    with open(mapping_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_json_file(mapping_file)
 
     mapping = {
         item['qtyCode']: item.get('qtyAbbr')
@@ -44,30 +43,24 @@ def load_common_edizm_mapping(project_root: Path) -> Dict[str, Dict[str, str]]:
 
     try:
         # Read all columns as strings and prevent pandas from interpreting "NA" as NaN
-        df = pd.read_csv(mapping_file, dtype=str, na_filter=False)
+        df = pd.read_csv(mapping_file, dtype=str, keep_default_na=False)
 
         # Standardize column names and values to uppercase for case-insensitive matching
         df.columns = df.columns.str.upper()
-        df['KOD'] = df['KOD'].str.replace('"', '').str.strip()
-        df['NAME'] = df['NAME'].str.upper().str.strip()
+        kods = df['KOD'].str.replace('"', '', regex=False).str.strip().tolist()
+        names = df['NAME'].str.upper().str.strip().tolist()
 
-        # Create canonical records from the main edizm file (vectorized)
+        # Create canonical records from the main edizm file in a single pass
         canonical_records = {}
-        # Use itertuples for better performance than iterrows
-        for row in df.itertuples(index=False):
-            record = {'KOD': row.KOD, 'NAME': row.NAME}
-            canonical_records[row.NAME] = record
+        for kod, name in zip(kods, names):
+            record = {'KOD': kod, 'NAME': name}
+            canonical_records[name] = record
             # Also map by KOD if it exists
-            if row.KOD:
-                canonical_records[row.KOD] = record
-
-        final_mapping = {}
-        # Populate mapping from the edizm file itself (KOD, NAME) - vectorized
-        for row in df.itertuples(index=False):
-            record = canonical_records[row.NAME]
-            final_mapping[row.NAME] = record
-            if row.KOD:
-                final_mapping[row.KOD] = record
+            if kod:
+                canonical_records[kod] = record
+
+        # The edizm file itself (KOD, NAME) seeds the mapping; aliases are added on top
+        final_mapping = dict(canonical_records)
 
         # Add a comprehensive set of aliases. All keys must be uppercase.
         aliases = {
@@ -6,6 +6,7 @@ import logging
 import re
 from typing import Dict, Optional
 
+import numpy as np
 import pandas as pd
 
 
@@ -90,15 +91,45 @@ def normalize_tnved_code(code: object, length: int = TNVED_LENGTH) -> str:
     return code_str + "0" * (length - len(code_str))
 
 
-def add_tnved_columns(df: pd.DataFrame, source_col: str = "TNVED") -> pd.DataFrame:
-    """Normalize TNVED and generate TNVED2, TNVED4, TNVED6, TNVED8 columns."""
-    df_processed = df.copy()
+def add_tnved_columns(
+    df: pd.DataFrame,
+    source_col: str = "TNVED",
+    categorical: bool = False,
+) -> pd.DataFrame:
+    """
+    Normalize TNVED and generate TNVED2, TNVED4, TNVED6, TNVED8 columns.
+
+    Only whole columns are assigned, so a shallow copy is enough to leave the
+    caller's frame untouched without duplicating its data. With
+    ``categorical=True`` the derived prefix columns are returned as
+    ``pd.Categorical`` (a few thousand distinct values at most).
+    """
+    df_processed = df.copy(deep=False)
     if source_col not in df_processed.columns:
         return df_processed
 
-    df_processed[source_col] = df_processed[source_col].apply(normalize_tnved_code)
+    # Normalize and slice each distinct code once, then broadcast the results
+    # back to the rows by their factorized codes.
+    column = df_processed[source_col]
+    codes, raw_values = pd.factorize(column)
+    raw_values = list(raw_values)
+    missing = codes == -1
+    if missing.any():
+        # None/NaN stringify differently, so each missing row keeps its own entry.
+        codes[missing] = len(raw_values) + np.arange(missing.sum())
+        raw_values.extend(column[missing].tolist())
+
+    normalized = np.array([normalize_tnved_code(value) for value in raw_values], dtype=object)
+    df_processed[source_col] = normalized[codes]
     for level in TNVED_DERIVED_LEVELS:
-        df_processed[f"TNVED{level}"] = df_processed[source_col].str[:level]
+        prefixes = np.array([code[:level] for code in normalized], dtype=object)
+        if categorical:
+            prefix_codes, prefix_values = pd.factorize(prefixes, sort=True)
+            df_processed[f"TNVED{level}"] = pd.Categorical.from_codes(
+                prefix_codes[codes], categories=prefix_values
+            )
+        else:
+            df_processed[f"TNVED{level}"] = prefixes[codes]
 
     return df_processed
 
@@ -141,21 +172,25 @@ def standardize_edizm_columns(
     logger: Optional[logging.Logger] = None,
 ) -> pd.DataFrame:
     """Map raw EDIZM values to canonical EDIZM and EDIZM_ISO columns."""
-    df_processed = df.copy()
+    # Whole-column assignments only: a shallow copy keeps the input intact.
+    df_processed = df.copy(deep=False)
     if "EDIZM" not in df_processed.columns:
         if logger:
             logger.warning("Cannot standardize EDIZM values: EDIZM column not found.")
         return df_processed
 
-    df_processed["EDIZM_upper"] = df_processed["EDIZM"].apply(normalize_edizm_value)
-    mapped_values = df_processed["EDIZM_upper"].map(common_edizm_map)
-
-    df_processed["EDIZM"] = mapped_values.map(
-        lambda value: value.get("NAME") if isinstance(value, dict) else None
-    )
-    df_processed["EDIZM_ISO"] = mapped_values.map(
-        lambda value: value.get("KOD") if isinstance(value, dict) else None
-    )
+    # Resolve each distinct raw value once, then broadcast the flat results
+    # back to the rows by their factorized codes. Missing values get code -1,
+    # which picks the trailing entry resolved for None.
+    codes, raw_values = pd.factorize(df_processed["EDIZM"])
+    upper_values = [normalize_edizm_value(value) for value in [*raw_values, None]]
+    records = [common_edizm_map.get(value) for value in upper_values]
+    names = [record.get("NAME") if isinstance(record, dict) else None for record in records]
+    kods = [record.get("KOD") if isinstance(record, dict) else None for record in records]
+
+    df_processed["EDIZM_upper"] = np.array(upper_values, dtype=object)[codes]
+    df_processed["EDIZM"] = np.array(names, dtype=object)[codes]
+    df_processed["EDIZM_ISO"] = np.array(kods, dtype=object)[codes]
 
     if logger:
         unmapped_mask = df_processed["EDIZM"].isnull()
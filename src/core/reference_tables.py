@@ -8,9 +8,22 @@ from typing import Dict, List
 import duckdb
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:  # optional: fall back to stdlib json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+def read_json_file(json_file: Path):
+    """Parse a JSON file from a single read_bytes(); uses orjson when it is installed."""
+    raw = json_file.read_bytes()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def _hs4_labels_paths(project_root: Path) -> List[Path]:
     """Candidate paths for curated HS4 short labels (metadata is canonical)."""
     return [
@@ -32,8 +45,7 @@ def load_hs4_labels(project_root: Path) -> pd.DataFrame:
         if not path.exists():
             continue
         try:
-            with open(path, "r", encoding="utf-8") as handle:
-                records = json.load(handle)
+            records = read_json_file(path)
             if not records:
                 logger.warning(f"HS4 labels file is empty: {path}")
                 return empty
@@ -284,8 +296,7 @@ def load_partner_mapping(project_root: Path) -> Dict[int, str]:
         logger.error(f"Partner mapping file not found at {mapping_file}")
         return {}
 
-    with open(mapping_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_json_file(mapping_file)
 
     # M49 codes are numeric, ISO2 are strings
     mapping = {
@@ -345,11 +356,9 @@ def load_tnved_mapping(project_root: Path) -> Dict[str, Dict[str, Dict[str, any]
             for level in [2, 4, 6, 8, 10]:
                 level_key = f'tnved{level}'
                 level_data = df[df['LEVEL'] == level]
-                for _, row in level_data.iterrows():
-                    code = str(row['KOD']).strip()
-                    name = str(row['NAME']).strip().upper()
-                    mappings[level_key][code] = {
-                        'name': name,
+                for code, name in zip(level_data['KOD'], level_data['NAME']):
+                    mappings[level_key][str(code).strip()] = {
+                        'name': str(name).strip().upper(),
                         'translated': False
                     }
 
@@ -362,8 +371,7 @@ def load_tnved_mapping(project_root: Path) -> Dict[str, Dict[str, Dict[str, any]
     # Load translations from missing_codes_translations_test.json
     if translations_file.exists():
         try:
-            with open(translations_file, 'r', encoding='utf-8') as f:
-                translations = json.load(f)
+            translations = read_json_file(translations_file)
 
             translations_count = 0
             for code_10, data in translations.items():
@@ -420,6 +428,7 @@ __all__ = [
     "load_strana_mapping",
     "load_hs4_labels",
     "load_tnved_mapping",
+    "read_json_file",
     "refresh_hs4_reference",
     "refresh_hs4_reference_db",
     "save_reference_tables",
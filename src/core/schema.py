@@ -1,9 +1,13 @@
 """Schema validation helpers for unified trade data."""
 
 import logging
+from datetime import date, datetime
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 from core.normalization_rules import add_tnved_columns
 
@@ -26,6 +30,16 @@ EXPECTED_SCHEMA = {
     'TNVED2': 'object'          # VARCHAR - первые 2 знака TNVED
 }
 
+# dtype predicates for the EXPECTED_SCHEMA type names: any string-like column
+# passes for VARCHAR, any float width for DECIMAL and any tz-naive datetime
+# resolution for DATE.
+_DTYPE_CHECKS = {
+    'object': pd.api.types.is_string_dtype,
+    'float64': pd.api.types.is_float_dtype,
+    'datetime64[ns]': pd.api.types.is_datetime64_dtype,
+}
+
+
 def validate_schema(df: pd.DataFrame, filename: str) -> bool:
     """
     Validate DataFrame against expected schema.
@@ -63,32 +77,30 @@ def validate_schema(df: pd.DataFrame, filename: str) -> bool:
                     # Convert to datetime and normalize to remove time component
                     # We'll use datetime64[ns] but normalized (time set to 00:00:00)
                     # DuckDB will recognize it as DATE when saving
-                    if 'datetime' not in str(actual_type):
-                        df[col] = pd.to_datetime(df[col]).dt.normalize()
-                    elif actual_type != 'datetime64[ns]':
-                        df[col] = pd.to_datetime(df[col]).dt.normalize()
-                    else:
+                    if pd.api.types.is_datetime64_any_dtype(actual_type):
                         # Already datetime, just normalize to remove time
                         df[col] = df[col].dt.normalize()
+                    else:
+                        df[col] = pd.to_datetime(df[col]).dt.normalize()
                     actual_type = df[col].dtype
                 except Exception as e:
                     logger.error(f"Failed to convert PERIOD to date in {filename}: {e}")
                     return False
 
-            if actual_type != expected_type:
+            if not _DTYPE_CHECKS[expected_type](actual_type):
                 logger.error(f"Column {col} has wrong type in {filename}: expected {expected_type}, got {actual_type}")
                 return False
 
     # Validate specific values
     if 'NAPR' in df.columns:
-        invalid_napr = df[~df['NAPR'].isin(['ИМ', 'ЭК'])]['NAPR'].unique()
-        if len(invalid_napr) > 0:
+        # Check the distinct values only, not a per-row mask
+        invalid_napr = [value for value in df['NAPR'].unique() if value not in ('ИМ', 'ЭК')]
+        if invalid_napr:
             logger.error(f"Invalid NAPR values in {filename}: {invalid_napr}")
             return False
 
     if 'PERIOD' in df.columns:
-        invalid_periods = df[df['PERIOD'].isnull()]
-        if len(invalid_periods) > 0:
+        if df['PERIOD'].isnull().any():
             logger.error(f"Null periods found in {filename}")
             return False
 
@@ -164,6 +176,28 @@ def smoke_check_merged_dataset(df: pd.DataFrame, label: str = "merged dataset")
     return passed
 
 
+def _start_year_filter(parquet_file: pq.ParquetFile, start_year: int):
+    """
+    Build a pyarrow filter expression ``PERIOD >= <start_year>-01-01``.
+
+    The expression is passed to ``pd.read_parquet`` so pyarrow prunes row groups
+    by their PERIOD statistics and drops older rows before pandas conversion.
+    Returns None when PERIOD is not a date or tz-naive timestamp column; the
+    caller then falls back to filtering in pandas.
+    """
+    schema = parquet_file.schema_arrow
+    if 'PERIOD' not in schema.names:
+        return None
+    period_type = schema.field('PERIOD').type
+    if pa.types.is_date(period_type):
+        bound = pa.scalar(date(start_year, 1, 1), type=period_type)
+    elif pa.types.is_timestamp(period_type) and period_type.tz is None:
+        bound = pa.scalar(datetime(start_year, 1, 1), type=period_type)
+    else:
+        return None
+    return pc.field('PERIOD') >= bound
+
+
 def load_and_validate_file(file_path: Path, start_year: int = None) -> pd.DataFrame:
     """
     Load parquet file and validate schema.
@@ -177,7 +211,12 @@ def load_and_validate_file(file_path: Path, start_year: int = None) -> pd.DataFr
     """
     try:
         logger.info(f"Loading {file_path}")
-        df = pd.read_parquet(file_path)
+        read_filter = None
+        if start_year:
+            parquet_file = pq.ParquetFile(file_path)
+            initial_rows = parquet_file.metadata.num_rows
+            read_filter = _start_year_filter(parquet_file, start_year)
+        df = pd.read_parquet(file_path, filters=read_filter)
 
         if start_year:
             if 'PERIOD' not in df.columns:
@@ -189,8 +228,10 @@ def load_and_validate_file(file_path: Path, start_year: int = None) -> pd.DataFr
                 else:
                     df['PERIOD'] = df['PERIOD'].dt.normalize()
 
-                initial_rows = len(df)
-                df = df[df['PERIOD'].dt.year >= start_year].copy()
+                if read_filter is None:
+                    # Compare against the year boundary directly. The copy matters:
+                    # fizob files skip add_tnved_columns, and the frame is assigned to later.
+                    df = df.loc[df['PERIOD'] >= pd.Timestamp(start_year, 1, 1)].copy()
                 if len(df) < initial_rows:
                     logger.info(f"Filtered {file_path.name} by start_year >= {start_year}. Kept {len(df)} of {initial_rows} rows.")
 
@@ -6,7 +6,7 @@ This script:
 1. Connects to unified_trade_data.duckdb
 2. Uses unified_trade_data_enriched view to include country and TNVED names
 3. Filters data by country (STRANA) and 2-digit TNVED code (TNVED2)
-4. Saves each slice as CSV file to data_interim_csv/ folder
+4. Saves each slice as CSV (or Excel/Parquet) file to data_interim_csv/ folder
 5. Uses polars for data processing
 """
 
@@ -15,8 +15,17 @@ import duckdb
 from pathlib import Path
 import logging
 import argparse
+import datetime
 import json
-from typing import Optional, Dict
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Dict, List, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to stdlib json
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -46,14 +55,41 @@ _COUNTRY_ORIGINAL_NAMES_CONFIG = {
     },
 }
 
+# Upper bound on concurrent shard writers (disk bandwidth saturates well before CPU count).
+_MAX_WRITE_WORKERS = 8
+
+# Arrow record batch size when streaming the unfiltered extraction.
+_STREAM_BATCH_ROWS = 1_000_000
+
+# Workbook that collects all slices of a multi-slice Excel extraction (one sheet per slice).
+_EXCEL_WORKBOOK_NAME = 'slices.xlsx'
+
+# PERIOD type of the former fetchdf() + pl.from_pandas path: CSV output keeps the
+# 2021-01-01T00:00:00.000000 format that downstream consumers of the slices parse.
+_PERIOD_DTYPE = pl.Datetime('us')
+
+# File extension per --format value.
+_OUTPUT_FILE_EXT = {
+    'csv': '.csv',
+    'excel': '.xlsx',
+    'parquet': '.parquet',
+}
+
+
+def _read_json(json_file: Path) -> Any:
+    """Parse a JSON file from a single read_bytes(); uses orjson when it is installed."""
+    raw = json_file.read_bytes()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 
 def _load_original_names_tr(codes_dir: Path) -> Dict[str, str]:
     """Turkey: JSON dict HS8 -> name."""
     code_names = {}
     for json_file in sorted(codes_dir.glob("turkey_codes*.json")):
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = _read_json(json_file)
             for hs8_code, commodity_name in data.items():
                 original_code = str(hs8_code).strip()
                 if len(original_code) < 8:
@@ -72,8 +108,7 @@ def _load_original_names_cn(codes_dir: Path) -> Dict[str, str]:
     code_names = {}
     for json_file in sorted(codes_dir.glob("*-codes.json")):
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = _read_json(json_file)
             for record in data:
                 if not record.get('TNVED'):
                     continue
@@ -96,20 +131,18 @@ def _load_original_names_in(codes_dir: Path) -> Dict[str, str]:
     code_names = {}
     for csv_file in sorted(codes_dir.glob("india_*.csv")):
         try:
-            df = pl.read_csv(csv_file, schema_overrides={'TNVED': pl.Utf8})
+            df = pl.read_csv(csv_file, schema_overrides={'TNVED': pl.Utf8, 'Commodity': pl.Utf8})
             if 'Commodity' not in df.columns:
                 continue
-            for row in df.iter_rows(named=True):
-                original_code = str(row.get('TNVED', '')).strip()
-                if not original_code:
-                    continue
-                if len(original_code) < 8:
-                    original_code = original_code.zfill(8)
-                elif len(original_code) > 8:
-                    original_code = original_code[:8]
-                name = row.get('Commodity')
-                if name and str(name).strip():
-                    code_names[original_code] = str(name).strip()
+            names = (
+                df.select(
+                    code=pl.col('TNVED').str.strip_chars(),
+                    name=pl.col('Commodity').str.strip_chars(),
+                )
+                .filter((pl.col('code').str.len_bytes() > 0) & (pl.col('name').str.len_bytes() > 0))
+                .with_columns(pl.col('code').str.zfill(8).str.slice(0, 8))
+            )
+            code_names.update(zip(names['code'].to_list(), names['name'].to_list()))
         except Exception as e:
             logger.error(f"Failed to process {csv_file.name}: {e}")
     return code_names
@@ -119,15 +152,21 @@ def load_country_original_names(country_iso2: str, project_root: Path) -> Dict[s
     """
     Load original commodity names for a country (8-digit HS code -> name).
     Supported: TR (Turkey), CN (China), IN (India). Others return {}.
+    Files are read once per (country, project_root); repeated calls are served from cache.
     """
-    country_iso2 = country_iso2.upper()
+    return dict(_load_country_original_names_cached(country_iso2.upper(), str(project_root)))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_country_original_names_cached(country_iso2: str, project_root: str) -> Tuple[Tuple[str, str], ...]:
+    """Cached body of load_country_original_names; returns hashable (code, name) pairs."""
     config = _COUNTRY_ORIGINAL_NAMES_CONFIG.get(country_iso2)
     if not config:
-        return {}
-    codes_dir = project_root.joinpath(*config['dir_relative'])
+        return ()
+    codes_dir = Path(project_root).joinpath(*config['dir_relative'])
     if not codes_dir.exists():
         logger.warning(f"Original names dir does not exist for {country_iso2}: {codes_dir}")
-        return {}
+        return ()
     loader = config['loader']
     if loader == 'json_dict':
         code_names = _load_original_names_tr(codes_dir)
@@ -136,10 +175,196 @@ def load_country_original_names(country_iso2: str, project_root: Path) -> Dict[s
     elif loader == 'india_csv':
         code_names = _load_original_names_in(codes_dir)
     else:
-        return {}
+        return ()
     if code_names:
         logger.info(f"Loaded {len(code_names)} original names for {country_iso2}")
-    return code_names
+    return tuple(code_names.items())
+
+
+def _register_original_names(
+    conn: duckdb.DuckDBPyConnection,
+    countries_list: List[str],
+    project_root: Path
+) -> Tuple[List[str], List[str]]:
+    """
+    Register per-country {hs8: name} lookup tables on the connection.
+    Returns extra SELECT expressions and LEFT JOIN clauses for the enriched view (aliased as e).
+    """
+    select_cols = []
+    joins = []
+    for country_iso in countries_list:
+        col_name = f'TNVED_NAME_ORIGINAL_{country_iso}'
+        code_names = load_country_original_names(country_iso, project_root)
+        if not code_names:
+            select_cols.append(f"'' AS {col_name}")
+            continue
+        table_name = f'{country_iso.lower()}_names'
+        alias = f'n_{country_iso.lower()}'
+        conn.register(
+            table_name,
+            pl.DataFrame({'hs8': list(code_names.keys()), col_name: list(code_names.values())})
+        )
+        # Fill only for rows of this country. TNVED8 is the stored TNVED[:8] prefix, so
+        # the key is not re-sliced per country; codes shorter than 8 never match an HS8 key
+        select_cols.append(f"COALESCE({alias}.{col_name}, '') AS {col_name}")
+        joins.append(
+            f" LEFT JOIN {table_name} {alias}"
+            f" ON e.STRANA = '{country_iso}' AND e.TNVED8 = {alias}.hs8"
+        )
+        logger.info(f"Added original names column {col_name}")
+    return select_cols, joins
+
+
+def _cast_period(df: pl.DataFrame) -> pl.DataFrame:
+    """Cast the DATE column PERIOD from DuckDB to _PERIOD_DTYPE."""
+    if 'PERIOD' not in df.columns:
+        return df
+    return df.with_columns(pl.col('PERIOD').cast(_PERIOD_DTYPE))
+
+
+def _write_slice(lf: pl.LazyFrame, output_path: Path, output_format: str) -> None:
+    """
+    Write one slice to disk.
+    CSV and Parquet are streamed with sink_*; Excel has no streaming writer, so the slice is collected first.
+    """
+    if output_format.lower() == 'excel':
+        lf.collect().write_excel(output_path)
+    elif output_format.lower() == 'parquet':
+        lf.sink_parquet(output_path, compression='zstd')
+    else:
+        lf.sink_csv(output_path)
+
+
+def _open_slices_workbook(output_dir: Path):
+    """
+    Open the shared workbook used when an Excel extraction produces several slices.
+    constant_memory flushes every finished row to a temp file, so the workbook does not
+    keep all sheets in memory until close().
+    """
+    import xlsxwriter  # only needed for --format excel
+
+    workbook_path = output_dir / _EXCEL_WORKBOOK_NAME
+    logger.info(f"Writing Excel slices to {workbook_path}")
+    return xlsxwriter.Workbook(
+        workbook_path,
+        {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd', 'nan_inf_to_errors': True},
+    )
+
+
+def _write_excel_sheet(workbook, df_slice: pl.DataFrame, output_path: Path, n_rows: int) -> None:
+    """
+    Write one slice as a sheet named after its would-be file name (e.g. CN_TNVED2_27).
+    Rows are written in order with write_row: polars write_excel adds an Excel table,
+    which xlsxwriter cannot build in constant_memory mode.
+    """
+    sheet_name = output_path.stem[:31]  # Excel limit on sheet name length
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, df_slice.columns)
+    for row_idx, row in enumerate(df_slice.iter_rows(), start=1):
+        worksheet.write_row(row_idx, 0, row)
+    logger.info(f"Saved {n_rows:,} rows to sheet {sheet_name}")
+
+
+def _write_slices(slices: List[Tuple[pl.LazyFrame, Path, int]], output_format: str) -> None:
+    """
+    Write all slices. CSV/Parquet shards are written concurrently (polars releases the GIL
+    while serializing); several Excel slices go to one workbook, one sheet per slice.
+    """
+    if output_format.lower() == 'excel' and len(slices) > 1:
+        with _open_slices_workbook(slices[0][1].parent) as workbook:
+            for lf_slice, output_path, n_rows in slices:
+                _write_excel_sheet(workbook, lf_slice.collect(), output_path, n_rows)
+        return
+    
+    if output_format.lower() == 'excel' or len(slices) < 2:
+        for lf_slice, output_path, n_rows in slices:
+            _write_slice(lf_slice, output_path, output_format)
+            logger.info(f"Saved {n_rows:,} rows to {output_path}")
+        return
+    
+    max_workers = min(_MAX_WRITE_WORKERS, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        written = executor.map(
+            lambda task: _write_slice(task[0], task[1], output_format),
+            slices
+        )
+        for (_, output_path, n_rows), _ in zip(slices, written):
+            logger.info(f"Saved {n_rows:,} rows to {output_path}")
+
+
+def _extract_all_slices_streaming(
+    conn: duckdb.DuckDBPyConnection,
+    query: str,
+    output_dir: Path,
+    output_format: str
+) -> None:
+    """
+    Write one file per (STRANA, TNVED2) without materializing the full result.
+    The query is ordered by the slice key and read as Arrow record batches; rows of the
+    current slice are buffered and flushed when the key changes, so peak memory is bounded
+    by the largest slice rather than the whole enriched view. Excel follows the same rule as
+    _write_slices: the first slice is held back until a second one shows up, so a single
+    slice gets its own file and several slices go to one workbook.
+    """
+    file_ext = _OUTPUT_FILE_EXT.get(output_format.lower(), '.csv')
+    query += " ORDER BY STRANA, TNVED2"
+    logger.info(f"Executing query: {query}")
+    result = conn.execute(query)
+    if hasattr(result, 'to_arrow_reader'):
+        reader = result.to_arrow_reader(_STREAM_BATCH_ROWS)
+    else:
+        reader = result.fetch_record_batch(_STREAM_BATCH_ROWS)
+    
+    pending = []
+    pending_key = None
+    total_rows = 0
+    workbook = None  # opened on the second Excel slice
+    held_excel_slice = None  # first Excel slice, written once the slice count is known
+    
+    def flush() -> None:
+        nonlocal workbook, held_excel_slice
+        df_slice = pl.concat(pending)
+        country_val, tnved2_val = pending_key
+        output_path = output_dir / f"{country_val}_TNVED2_{tnved2_val}{file_ext}"
+        if output_format.lower() == 'excel':
+            if workbook is None and held_excel_slice is None:
+                held_excel_slice = (df_slice, output_path)
+                return
+            if workbook is None:
+                workbook = _open_slices_workbook(output_dir)
+                held_df, held_path = held_excel_slice
+                held_excel_slice = None
+                _write_excel_sheet(workbook, held_df, held_path, len(held_df))
+            _write_excel_sheet(workbook, df_slice, output_path, len(df_slice))
+            return
+        _write_slice(df_slice.lazy(), output_path, output_format)
+        logger.info(f"Saved {len(df_slice):,} rows to {output_path}")
+    
+    try:
+        for batch in reader:
+            chunk = _cast_period(pl.from_arrow(batch))
+            total_rows += len(chunk)
+            parts = chunk.partition_by(['STRANA', 'TNVED2'], maintain_order=True, as_dict=True)
+            for key, part in parts.items():
+                if pending and key != pending_key:
+                    flush()
+                    pending = []
+                pending_key = key
+                pending.append(part)
+        if pending:
+            flush()
+        if held_excel_slice is not None:
+            held_df, held_path = held_excel_slice
+            _write_slice(held_df.lazy(), held_path, output_format)
+            logger.info(f"Saved {len(held_df):,} rows to {held_path}")
+    finally:
+        if workbook is not None:
+            workbook.close()
+    
+    if total_rows == 0:
+        logger.warning("Query returned no data")
+    else:
+        logger.info(f"Retrieved {total_rows:,} rows")
 
 
 def extract_slice(
@@ -163,7 +388,7 @@ def extract_slice(
         tnved4: 4-digit TNVED code to filter (if specified, overrides tnved2)
         year: Year to filter (if None, extracts for all years)
         project_root: Project root path (for loading Turkey names)
-        output_format: Output format - 'csv' or 'excel' (default: 'csv')
+        output_format: Output format - 'csv', 'excel' or 'parquet' (default: 'csv')
     """
     if not db_path.exists():
         logger.error(f"Database not found at {db_path}")
@@ -175,83 +400,97 @@ def extract_slice(
     conn = duckdb.connect(str(db_path), read_only=True)
     
     try:
-        # Build query using enriched view to include country and TNVED names
-        query = "SELECT * FROM unified_trade_data_enriched WHERE 1=1"
+        filters = ""
         params = []
         
         if countries and len(countries) > 0:
             # Normalize country codes to uppercase
             countries_upper = [c.upper() for c in countries]
             if len(countries_upper) == 1:
-                query += " AND STRANA = ?"
+                filters += " AND STRANA = ?"
                 params.append(countries_upper[0])
             else:
                 # Use IN clause for multiple countries
                 placeholders = ', '.join(['?' for _ in countries_upper])
-                query += f" AND STRANA IN ({placeholders})"
+                filters += f" AND STRANA IN ({placeholders})"
                 params.extend(countries_upper)
         
         # If tnved4 is specified, use it (and derive tnved2 from it)
         if tnved4:
             tnved4_normalized = tnved4.zfill(4)
-            query += " AND TNVED4 = ?"
+            filters += " AND TNVED4 = ?"
             params.append(tnved4_normalized)
             # Also filter by TNVED2 derived from TNVED4
             tnved2_from_4 = tnved4_normalized[:2]
-            query += " AND TNVED2 = ?"
+            filters += " AND TNVED2 = ?"
             params.append(tnved2_from_4)
         elif tnved2:
-            query += " AND TNVED2 = ?"
+            filters += " AND TNVED2 = ?"
             params.append(tnved2.zfill(2))  # Ensure 2 digits with leading zeros
         
         if year:
-            query += " AND EXTRACT(YEAR FROM PERIOD) >= ?"
-            params.append(year)
+            # Range predicate on PERIOD itself so DuckDB can skip row groups by min/max
+            filters += " AND PERIOD >= ?"
+            params.append(datetime.date(year, 1, 1))
+        
+        # Original names per country (TR, CN, IN, ...): for countries in filter, or, without
+        # --country, for the supported countries that actually occur under the same filters
+        countries_list = list(dict.fromkeys(c.upper() for c in (countries or [])))
+        if not countries_list:
+            countries_list = sorted(_COUNTRY_ORIGINAL_NAMES_CONFIG)
+        # Only try for countries we support
+        countries_list = [c for c in countries_list if c in _COUNTRY_ORIGINAL_NAMES_CONFIG]
+        if not project_root:
+            countries_list = []
+        if not countries and countries_list:
+            # Cheap scan of the base table (no enriched-view window) so that name files
+            # are loaded only for countries that will be in the result
+            present = {
+                row[0] for row in conn.execute(
+                    f"SELECT DISTINCT STRANA FROM unified_trade_data WHERE 1=1{filters}", params
+                ).fetchall()
+            }
+            countries_list = [c for c in countries_list if c in present]
+        names_cols, names_joins = _register_original_names(conn, countries_list, project_root)
+        
+        # Build query using enriched view to include country and TNVED names;
+        # original names are attached by DuckDB hash joins against the registered lookups
+        query = (
+            f"SELECT {', '.join(['e.*'] + names_cols)} "
+            f"FROM unified_trade_data_enriched e{''.join(names_joins)} WHERE 1=1{filters}"
+        )
+        
+        # Without any filter the result is the whole enriched view: it is streamed
+        # shard by shard instead of being fetched into one frame
+        stream_all = not (countries or tnved2 or tnved4 or year)
+        if stream_all:
+            _extract_all_slices_streaming(conn, query, output_dir, output_format)
+            return
         
         logger.info(f"Executing query: {query}")
         if params:
             logger.info(f"Parameters: {params}")
         
-        # Execute query and convert to polars DataFrame
-        df_pandas = conn.execute(query, params).fetchdf()
+        # Execute query straight into a polars DataFrame (Arrow-backed, no pandas hop)
+        df = _cast_period(conn.execute(query, params).pl())
         
-        if df_pandas.empty:
+        if df.is_empty():
             logger.warning("Query returned no data")
             return
         
-        # Convert to polars
-        df = pl.from_pandas(df_pandas)
         logger.info(f"Retrieved {len(df):,} rows")
         
-        # Add original names per country (TR, CN, IN, ...); for countries in filter or in data if no filter
-        countries_list = [c.upper() for c in (countries or [])]
-        if not countries_list:
-            countries_list = sorted(df['STRANA'].unique().to_list())
-        # Only try for countries we support
-        countries_list = [c for c in countries_list if c in _COUNTRY_ORIGINAL_NAMES_CONFIG]
-        if countries_list and project_root:
-            for country_iso in countries_list:
-                code_names = load_country_original_names(country_iso, project_root)
-                col_name = f'TNVED_NAME_ORIGINAL_{country_iso}'
-                if code_names:
-                    def get_name(tnved_code: str, names: Dict[str, str]) -> str:
-                        if not tnved_code or len(tnved_code) < 8:
-                            return ''
-                        return names.get(tnved_code[:8], '')
-
-                    # Fill only for rows of this country
-                    df = df.with_columns(
-                        pl.when(pl.col('STRANA') == country_iso)
-                        .then(pl.col('TNVED').map_elements(lambda c: get_name(c, code_names), return_dtype=pl.Utf8))
-                        .otherwise(pl.lit(''))
-                        .alias(col_name)
-                    )
-                    logger.info(f"Added original names column {col_name}")
-                else:
-                    df = df.with_columns(pl.lit('').alias(col_name))
+        # Single pass over the data for slice keys; everything below groups this small table
+        slice_counts = df.group_by(['STRANA', 'TNVED2']).len()
+        country_counts = slice_counts.group_by('STRANA').agg(pl.col('len').sum()).sort('STRANA')
         
         # Determine output filename and extension
-        file_ext = '.xlsx' if output_format.lower() == 'excel' else '.csv'
+        file_ext = _OUTPUT_FILE_EXT.get(output_format.lower(), '.csv')
+        # Slices are written from a lazy frame so CSV output is streamed by
+        # sink_csv instead of materializing each filtered slice first.
+        lf = df.lazy()
+        # (lazy slice, output path, row count) for every file to write
+        slices = []
         
         # Check if we have a single country and code combination
         has_countries = countries and len(countries) > 0
@@ -266,72 +505,42 @@ def extract_slice(
                 code_part = f"TNVED2_{tnved2.zfill(2)}"
             year_part = f"_from_{year}" if year else ""
             filename = f"{country}_{code_part}{year_part}{file_ext}"
-            output_path = output_dir / filename
-            
-            # Save based on format
-            if output_format.lower() == 'excel':
-                df.write_excel(output_path)
-            else:
-                df.write_csv(output_path)
-            logger.info(f"Saved to {output_path}")
+            slices.append((lf, output_dir / filename, len(df)))
         elif has_countries and len(countries) > 1 and has_code:
             # Multiple countries, single code: create separate file for each country
-            for country_val in sorted(df['STRANA'].unique().to_list()):
-                df_slice = df.filter(pl.col('STRANA') == country_val)
+            for country_val, n_rows in country_counts.iter_rows():
                 if tnved4:
                     code_part = f"TNVED4_{tnved4.zfill(4)}"
                 else:
                     code_part = f"TNVED2_{tnved2.zfill(2)}"
                 year_part = f"_from_{year}" if year else ""
                 filename = f"{country_val}_{code_part}{year_part}{file_ext}"
-                output_path = output_dir / filename
-                if output_format.lower() == 'excel':
-                    df_slice.write_excel(output_path)
-                else:
-                    df_slice.write_csv(output_path)
-                logger.info(f"Saved {len(df_slice):,} rows to {output_path}")
+                slices.append((lf.filter(pl.col('STRANA') == country_val), output_dir / filename, n_rows))
         else:
             # Multiple slices: group by country and/or TNVED2
             if has_countries and len(countries) == 1:
                 # Single country: group by TNVED2 only
                 country = countries[0].upper()
-                for tnved2_val in sorted(df['TNVED2'].unique().to_list()):
-                    df_slice = df.filter(pl.col('TNVED2') == tnved2_val)
+                tnved2_counts = slice_counts.group_by('TNVED2').agg(pl.col('len').sum()).sort('TNVED2')
+                for tnved2_val, n_rows in tnved2_counts.iter_rows():
                     filename = f"{country}_TNVED2_{tnved2_val}{file_ext}"
-                    output_path = output_dir / filename
-                    if output_format.lower() == 'excel':
-                        df_slice.write_excel(output_path)
-                    else:
-                        df_slice.write_csv(output_path)
-                    logger.info(f"Saved {len(df_slice):,} rows to {output_path}")
+                    slices.append((lf.filter(pl.col('TNVED2') == tnved2_val), output_dir / filename, n_rows))
             elif tnved2:
                 # Group by country only
-                for country_val in sorted(df['STRANA'].unique().to_list()):
-                    df_slice = df.filter(pl.col('STRANA') == country_val)
+                for country_val, n_rows in country_counts.iter_rows():
                     filename = f"{country_val}_TNVED2_{tnved2.zfill(2)}{file_ext}"
-                    output_path = output_dir / filename
-                    if output_format.lower() == 'excel':
-                        df_slice.write_excel(output_path)
-                    else:
-                        df_slice.write_csv(output_path)
-                    logger.info(f"Saved {len(df_slice):,} rows to {output_path}")
+                    slices.append((lf.filter(pl.col('STRANA') == country_val), output_dir / filename, n_rows))
             else:
                 # Group by both country and TNVED2
-                grouped = df.group_by(['STRANA', 'TNVED2']).agg(pl.count())
-                for row in grouped.iter_rows(named=True):
-                    country_val = row['STRANA']
-                    tnved2_val = row['TNVED2']
-                    df_slice = df.filter(
+                for country_val, tnved2_val, n_rows in slice_counts.iter_rows():
+                    df_slice = lf.filter(
                         (pl.col('STRANA') == country_val) & 
                         (pl.col('TNVED2') == tnved2_val)
                     )
                     filename = f"{country_val}_TNVED2_{tnved2_val}{file_ext}"
-                    output_path = output_dir / filename
-                    if output_format.lower() == 'excel':
-                        df_slice.write_excel(output_path)
-                    else:
-                        df_slice.write_csv(output_path)
-                    logger.info(f"Saved {len(df_slice):,} rows to {output_path}")
+                    slices.append((df_slice, output_dir / filename, n_rows))
+        
+        _write_slices(slices, output_format)
     
     finally:
         conn.close()
@@ -382,9 +591,9 @@ def main():
     parser.add_argument(
         '--format',
         type=str,
-        choices=['csv', 'excel'],
+        choices=['csv', 'excel', 'parquet'],
         default='csv',
-        help="Output format: 'csv' or 'excel' (default: csv)"
+        help="Output format: 'csv', 'excel' or 'parquet' (default: csv)"
     )
     
     args = parser.parse_args()
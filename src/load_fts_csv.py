@@ -19,9 +19,18 @@
   python src/load_fts_csv.py --tnved2 27
   python src/load_fts_csv.py --tnved4 2710
 """
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
+from typing import Iterator, Optional
 import argparse
+import codecs
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 import re
 import logging
 
@@ -52,138 +61,394 @@ FTS_COLUMN_MAP = {
     "EDIZM": ["EDIZM", "edizm", "Единица", "ED_IZM", "qtyUnitAbbr", "altQtyUnitAbbr"],
 }
 
-
-def _detect_sep_encoding(path: Path) -> tuple:
-    """Определяет разделитель и кодировку по первой строке."""
+# Нормализация направления -> ИМ/ЭК
+NAPR_MAP = {"1": "ИМ", "2": "ЭК", "ИМПОРТ": "ИМ", "ЭКСПОРТ": "ЭК", "IMPORT": "ИМ", "EXPORT": "ЭК"}
+
+# Период в имени файла (2021-01.csv, 202101.csv, 2021_01.csv) и очистка TNVED от нецифровых символов
+_PERIOD_RE = re.compile(r"(\d{4})[-_]?(\d{2})")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Итоговая схема Parquet (потоковая запись требует одинаковой схемы у всех блоков)
+FTS_OUTPUT_COLUMNS = list(FTS_COLUMN_MAP) + ["PERIOD", "TNVED2", "TNVED4", "TNVED6"]
+FTS_REQUIRED_COLUMNS = ["NAPR", "PERIOD", "STRANA", "TNVED", "STOIM"]
+FTS_ARROW_SCHEMA = pa.schema(
+    [(c, pa.float64()) if c in ("STOIM", "NETTO", "KOL") else (c, pa.string()) for c in FTS_COLUMN_MAP]
+    + [("PERIOD", pa.timestamp("ns")), ("TNVED2", pa.string()), ("TNVED4", pa.string()), ("TNVED6", pa.string())]
+)
+
+# Колонки с малым числом различных значений (для TNVED — тысячи кодов на миллионы строк), хранимые в памяти как category
+FTS_CATEGORICAL_COLUMNS = ["NAPR", "STRANA", "EDIZM", "TNVED", "TNVED2", "TNVED4", "TNVED6"]
+
+# Размер блока потокового чтения CSV: pyarrow — в байтах, pandas (fallback) — в строках
+CSV_BLOCK_SIZE = 32 << 20
+PANDAS_CHUNK_ROWS = 500_000
+# Чем заменяются пустые NAPR/STRANA перед строковой нормализацией: pandas-чтение давало NaN → "nan"
+# → "NAN", а pyarrow отдаёт None ("None" → "NONE"); значение одно для обоих читателей
+_MISSING_TEXT = "nan"
+# Сколько байт читать для определения разделителя и кодировки
+SNIFF_BYTES = 64 << 10
+
+
+@lru_cache(maxsize=None)
+def _detect_sep_encoding(path_str: str) -> tuple:
+    """Определяет кодировку по первым SNIFF_BYTES байт файла, разделитель — по первой строке.
+
+    Декодируется весь прочитанный буфер, а не только заголовок: при ASCII-заголовке
+    кириллица в строках данных (cp1251) иначе была бы принята за utf-8.
+    """
+    with open(path_str, "rb") as f:
+        buf = f.read(SNIFF_BYTES)
     for enc in ["utf-8", "cp1251", "latin1"]:
         try:
-            with open(path, encoding=enc) as f:
-                first = f.readline()
-            if ";" in first and first.count(";") > first.count(","):
-                return ";", enc
-            return ",", enc
+            # Инкрементальный декодер не падает на многобайтном символе, обрезанном границей буфера
+            text = codecs.getincrementaldecoder(enc)().decode(buf, final=False)
         except UnicodeDecodeError:
             continue
+        first = text.split("\n", 1)[0]
+        if ";" in first and first.count(";") > first.count(","):
+            return ";", enc
+        return ",", enc
     return ",", "utf-8"
 
 
-def _map_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Сопоставляет колонки ФТС с нашей схемой."""
-    result = {}
-    cols_upper = {c.upper(): c for c in df.columns}
-    cols_lower = {c.lower(): c for c in df.columns}
-    cols_raw = {c: c for c in df.columns}
-
+def _read_csv_as_strings(path: Path, sep: str, enc: str) -> pd.DataFrame:
+    """Читает CSV со всеми колонками как строки: многопоточный pyarrow.csv, при ошибке Arrow — pandas."""
+    read_options = pv.ReadOptions(encoding=enc, block_size=CSV_BLOCK_SIZE)
+    parse_options = pv.ParseOptions(delimiter=sep)
+    try:
+        # Имена колонок берём из первого блока, затем читаем все колонки как string,
+        # чтобы Arrow не выводил числовые типы (иначе TNVED теряет ведущие нули)
+        with pv.open_csv(path, read_options=pv.ReadOptions(encoding=enc), parse_options=parse_options) as reader:
+            column_names = reader.schema.names
+        convert_options = pv.ConvertOptions(
+            column_types={c: pa.string() for c in column_names},
+            strings_can_be_null=True,
+        )
+        table = pv.read_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+        return table.to_pandas()
+    except pa.ArrowInvalid as e:
+        logger.debug(f"pyarrow не смог прочитать {path.name} ({e}), читаем через pandas")
+        return pd.read_csv(path, sep=sep, encoding=enc, low_memory=False, dtype=str)
+
+
+def _resolve_columns(columns) -> dict:
+    """{наша колонка: колонка файла} по FTS_COLUMN_MAP; побеждает первый найденный вариант."""
+    cols_upper = {c.upper(): c for c in columns}
+    mapping = {}
     for our_col, variants in FTS_COLUMN_MAP.items():
-        found = None
         for v in variants:
             key = v.upper() if len(v) > 2 else v
             if key in cols_upper:
-                found = cols_upper[key]
+                mapping[our_col] = cols_upper[key]
                 break
-            if v in cols_raw:
-                found = v
+            if v in columns:
+                mapping[our_col] = v
                 break
-        if found is not None:
-            result[our_col] = df[found]
+    return mapping
 
-    return pd.DataFrame(result) if result else pd.DataFrame()
+
+def _map_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Сопоставляет колонки ФТС с нашей схемой."""
+    mapping = _resolve_columns(df.columns)
+    if not mapping:
+        return pd.DataFrame()
+    # Одна выборка колонок вместо сборки нового DataFrame по колонкам
+    return df.loc[:, list(mapping.values())].set_axis(list(mapping), axis=1)
 
 
 def _parse_period_from_filename(name: str):
     """Извлекает период из имени файла: 2021-01.csv, 202101.csv, 2021_01.csv."""
-    m = re.search(r"(\d{4})[-_]?(\d{2})", name)
+    m = _PERIOD_RE.search(name)
     if m:
         return f"{m.group(1)}-{m.group(2)}-01"
     return None
 
 
-def load_fts_csv_files() -> pd.DataFrame:
-    """Загружает все CSV из data_raw/fts_data/ и объединяет в один DataFrame."""
-    if not FTS_DIR.exists():
-        logger.error(f"Папка не найдена: {FTS_DIR}")
-        return pd.DataFrame()
+def _normalize_napr_value(value: str) -> str:
+    """ИМ/ЭК из 1/2, Импорт/Экспорт, Import/Export; прочие значения — в верхнем регистре без пробелов."""
+    value = value.upper().strip()
+    return NAPR_MAP.get(value, value)
 
-    csv_files = sorted(FTS_DIR.glob("*.csv"))
-    if not csv_files:
-        logger.error(f"CSV-файлы не найдены в {FTS_DIR}")
-        return pd.DataFrame()
 
-    logger.info(f"Найдено файлов: {len(csv_files)}")
+def _categorical_from_categories(codes, values: pd.Series) -> pd.Categorical:
+    """category по кодам исходной категории и преобразованным значениям её категорий (значения могут совпадать)."""
+    value_codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(value_codes[codes], categories=uniques)
 
-    dfs = []
-    for path in csv_files:
-        period = _parse_period_from_filename(path.name)
-        sep, enc = _detect_sep_encoding(path)
 
-        try:
-            df = pd.read_csv(path, sep=sep, encoding=enc, low_memory=False, dtype=str)
-        except Exception as e:
-            logger.warning(f"Ошибка чтения {path.name}: {e}")
-            continue
+def _normalize_frame(df: pd.DataFrame, file_name: str, period: Optional[str]) -> Optional[pd.DataFrame]:
+    """Сопоставляет колонки и нормализует NAPR/STOIM/NETTO/KOL/TNVED/STRANA; None, если колонки не распознаны."""
+    mapped = _map_columns(df)
+    if mapped.empty:
+        logger.warning(f"Не удалось сопоставить колонки в {file_name}. Колонки: {list(df.columns)}")
+        # Пробуем использовать как есть, если названия похожи
+        if "STOIM" in df.columns or "G46" in df.columns or "Стоимость" in df.columns:
+            mapped = df.copy()
+            if period and "PERIOD" not in mapped.columns:
+                mapped["PERIOD"] = period
+        else:
+            return None
+
+    if period and "PERIOD" not in mapped.columns:
+        mapped["PERIOD"] = period
+
+    # Нормализация NAPR
+    # (upper/strip и замена применяются к категориям — нескольким уникальным значениям, а не к N строкам)
+    if "NAPR" in mapped.columns:
+        napr = mapped["NAPR"].fillna(_MISSING_TEXT).astype(str).astype("category")
+        mapped["NAPR"] = napr.map(_normalize_napr_value)
+
+    # Числовые колонки
+    for col in ["STOIM", "NETTO", "KOL"]:
+        if col in mapped.columns:
+            mapped[col] = pd.to_numeric(mapped[col].replace("", None), errors="coerce")
+
+    # TNVED — строка, дополнение нулями справа до 10; TNVED2, TNVED4, TNVED6 — префиксы.
+    # Различных кодов на порядки меньше, чем строк: очищаем категории, а по строкам раскладываем коды
+    if "TNVED" in mapped.columns:
+        tnved = mapped["TNVED"].astype(str).astype("category")
+        codes = tnved.cat.codes.to_numpy()
+        digits = pd.Series(tnved.cat.categories, dtype=object).str.strip().str.replace(_NON_DIGIT_RE, "", regex=True)
+        clean = digits.str.ljust(10, "0").str.slice(0, 10).where(digits.str.len() > 0, "")
+        mapped["TNVED"] = _categorical_from_categories(codes, clean)
+        mapped["TNVED2"] = _categorical_from_categories(codes, clean.str[:2])
+        mapped["TNVED4"] = _categorical_from_categories(codes, clean.str[:4])
+        mapped["TNVED6"] = _categorical_from_categories(codes, clean.str[:6])
+
+    # STRANA — приведение к ISO2 если нужно (цифровой код)
+    if "STRANA" in mapped.columns:
+        mapped["STRANA"] = mapped["STRANA"].fillna(_MISSING_TEXT).astype(str).str.strip().str.upper()
+
+    return mapped
+
+
+def _process_one(path: Path) -> Optional[pa.Table]:
+    """Читает и нормализует один CSV ФТС в Arrow-таблицу; None, если файл пропущен.
+
+    Функция на уровне модуля, чтобы её можно было передать в ProcessPoolExecutor;
+    Arrow-таблица передаётся из процесса дешевле DataFrame.
+    """
+    period = _parse_period_from_filename(path.name)
+    sep, enc = _detect_sep_encoding(str(path))
+
+    try:
+        df = _read_csv_as_strings(path, sep, enc)
+    except Exception as e:
+        logger.warning(f"Ошибка чтения {path.name}: {e}")
+        return None
 
-        if df.empty:
-            continue
+    if df.empty:
+        return None
+
+    mapped = _normalize_frame(df, path.name, period)
+    # Исходный строковый DataFrame больше не нужен — освобождаем до конвертаций ниже
+    del df
+    if mapped is None:
+        return None
+
+    # Низкокардинальные строковые колонки — category: в разы меньше памяти и быстрее concat/value_counts
+    for col in FTS_CATEGORICAL_COLUMNS:
+        if col in mapped.columns:
+            mapped[col] = mapped[col].astype("category")
+
+    logger.info(f"  Загружен {path.name}: {len(mapped)} строк")
+    return pa.Table.from_pandas(mapped, preserve_index=False)
+
+
+def _iter_csv_chunks(path: Path, sep: str, enc: str) -> Iterator[pd.DataFrame]:
+    """Читает CSV блоками (все колонки как строки): потоковый pyarrow.csv, при ошибке Arrow — pandas chunksize."""
+    parse_options = pv.ParseOptions(delimiter=sep)
+    try:
+        with pv.open_csv(path, read_options=pv.ReadOptions(encoding=enc), parse_options=parse_options) as reader:
+            column_names = reader.schema.names
+        convert_options = pv.ConvertOptions(
+            column_types={c: pa.string() for c in column_names},
+            strings_can_be_null=True,
+        )
+        reader = pv.open_csv(
+            path,
+            read_options=pv.ReadOptions(encoding=enc, block_size=CSV_BLOCK_SIZE),
+            parse_options=parse_options,
+            convert_options=convert_options,
+        )
+    except pa.ArrowInvalid as e:
+        logger.debug(f"pyarrow не смог прочитать {path.name} ({e}), читаем через pandas")
+        yield from pd.read_csv(path, sep=sep, encoding=enc, low_memory=False, dtype=str, chunksize=PANDAS_CHUNK_ROWS)
+        return
+    with reader:
+        for batch in reader:
+            if batch.num_rows:
+                yield batch.to_pandas()
 
-        mapped = _map_columns(df)
-        if mapped.empty:
-            logger.warning(f"Не удалось сопоставить колонки в {path.name}. Колонки: {list(df.columns)}")
-            # Пробуем использовать как есть, если названия похожи
-            if "STOIM" in df.columns or "G46" in df.columns or "Стоимость" in df.columns:
-                mapped = df.copy()
-                if period and "PERIOD" not in mapped.columns:
-                    mapped["PERIOD"] = period
-            else:
+
+def _filter_tnved(df: pd.DataFrame, tnved2_filter: Optional[str], tnved4_filter: Optional[str]) -> pd.DataFrame:
+    """Оставляет строки с заданными TNVED2/TNVED4 (None — без фильтра)."""
+    if tnved2_filter is not None:
+        df = df[df["TNVED2"] == tnved2_filter]
+        if tnved4_filter is not None:
+            df = df[df["TNVED4"] == tnved4_filter]
+    return df
+
+
+def _read_file_tables(
+    path: Path,
+    tnved2_filter: Optional[str] = None,
+    tnved4_filter: Optional[str] = None,
+) -> Optional[list]:
+    """Читает один CSV блоками в список Arrow-таблиц схемы FTS_ARROW_SCHEMA; None, если файл пропущен.
+
+    Результат отдаётся только для целиком разобранного файла: при ошибке на середине
+    чтения возвращается None, а не уже прочитанные блоки. Функция на уровне модуля,
+    чтобы её можно было передать в ProcessPoolExecutor.
+    """
+    period = _parse_period_from_filename(path.name)
+    sep, enc = _detect_sep_encoding(str(path))
+    file_tables = []
+    try:
+        for chunk in _iter_csv_chunks(path, sep, enc):
+            mapped = _normalize_frame(chunk, path.name, period)
+            if mapped is None:
+                return None
+            mapped = mapped.reindex(columns=FTS_OUTPUT_COLUMNS)
+            mapped["PERIOD"] = pd.to_datetime(mapped["PERIOD"], errors="coerce")
+            mapped = mapped.dropna(subset=FTS_REQUIRED_COLUMNS)
+            mapped = _filter_tnved(mapped, tnved2_filter, tnved4_filter)
+            if mapped.empty:
                 continue
+            file_tables.append(pa.Table.from_pandas(mapped, schema=FTS_ARROW_SCHEMA, preserve_index=False))
+    except Exception as e:
+        logger.warning(f"Ошибка чтения {path.name}: {e}")
+        return None
+    return file_tables
+
+
+def write_fts_parquet(
+    output_path: Path,
+    tnved2_filter: Optional[str] = None,
+    tnved4_filter: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> int:
+    """Потоково записывает все CSV из data_raw/fts_data/ в один Parquet; возвращает число строк.
+
+    Каждый файл читается блоками, блок нормализуется и фильтруется; блоки файла копятся
+    как Arrow-таблицы и дописываются в ParquetWriter только после того, как файл разобран
+    целиком, без итогового pd.concat. Файл, на котором чтение упало на середине,
+    пропускается целиком, а не оставляет в Parquet часть строк.
+    Файлы разбираются в пуле процессов (max_workers=None — по числу CPU, 1 — последовательно
+    в текущем процессе) порциями по числу процессов: в памяти не больше одной порции файлов,
+    а в Parquet они пишутся в порядке имён, как и при последовательном разборе.
+    Запись идёт во временный файл рядом с output_path и переименовывается только после
+    успешного закрытия, поэтому прерванный запуск не оставляет «свежий» битый Parquet.
+    Файл не создаётся, если после фильтров не осталось ни одной строки.
+    """
+    if not FTS_DIR.exists():
+        logger.error(f"Папка не найдена: {FTS_DIR}")
+        return 0
 
-        if period and "PERIOD" not in mapped.columns:
-            mapped["PERIOD"] = period
+    csv_files = sorted(FTS_DIR.glob("*.csv"))
+    if not csv_files:
+        logger.error(f"CSV-файлы не найдены в {FTS_DIR}")
+        return 0
 
-        # Нормализация NAPR
-        if "NAPR" in mapped.columns:
-            napr = mapped["NAPR"].astype(str).str.upper().str.strip()
-            napr = napr.replace({"1": "ИМ", "2": "ЭК", "ИМПОРТ": "ИМ", "ЭКСПОРТ": "ЭК", "IMPORT": "ИМ", "EXPORT": "ЭК"})
-            mapped["NAPR"] = napr
+    logger.info(f"Найдено файлов: {len(csv_files)}")
 
-        # Числовые колонки
-        for col in ["STOIM", "NETTO", "KOL"]:
-            if col in mapped.columns:
-                mapped[col] = pd.to_numeric(mapped[col].replace("", None), errors="coerce")
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    writer = None
+    total = 0
 
-        # TNVED — строка, дополнение нулями справа до 10
-        if "TNVED" in mapped.columns:
-            tnved = mapped["TNVED"].astype(str).str.strip().str.replace(r"\D", "", regex=True)
-            mapped["TNVED"] = tnved.apply(lambda x: (x + "0" * (10 - len(x)))[:10] if len(x) > 0 else "")
+    def write_file(path: Path, file_tables: Optional[list]) -> None:
+        nonlocal writer, total
+        if file_tables is None:
+            return
+        file_rows = 0
+        for table in file_tables:
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, FTS_ARROW_SCHEMA, compression="zstd")
+            writer.write_table(table)
+            file_rows += table.num_rows
+        logger.info(f"  Загружен {path.name}: {file_rows} строк")
+        total += file_rows
+
+    try:
+        if len(csv_files) > 1 and max_workers != 1:
+            batch_size = max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=batch_size) as executor:
+                for start in range(0, len(csv_files), batch_size):
+                    batch = csv_files[start:start + batch_size]
+                    # map отдаёт результаты в порядке входных файлов
+                    results = executor.map(_read_file_tables, batch, repeat(tnved2_filter), repeat(tnved4_filter))
+                    for path, file_tables in zip(batch, results):
+                        write_file(path, file_tables)
+        else:
+            for path in csv_files:
+                write_file(path, _read_file_tables(path, tnved2_filter, tnved4_filter))
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    if writer is not None:
+        writer.close()
+        tmp_path.replace(output_path)
+    return total
+
+
+def _output_is_fresh(output_path: Path) -> bool:
+    """True, если Parquet новее каждого CSV и самой папки ФТС (добавление/удаление файла меняет её mtime)."""
+    if not output_path.exists() or not FTS_DIR.exists():
+        return False
+    sources = [FTS_DIR, *FTS_DIR.glob("*.csv")]
+    return output_path.stat().st_mtime >= max(p.stat().st_mtime for p in sources)
+
+
+def load_fts_csv_files(max_workers: Optional[int] = None) -> pd.DataFrame:
+    """Загружает все CSV из data_raw/fts_data/ и объединяет в один DataFrame.
+
+    Файлы обрабатываются параллельно в пуле процессов (max_workers=None — по числу CPU,
+    1 — последовательно в текущем процессе).
+    """
+    if not FTS_DIR.exists():
+        logger.error(f"Папка не найдена: {FTS_DIR}")
+        return pd.DataFrame()
 
-        # TNVED2, TNVED4, TNVED6
-        if "TNVED" in mapped.columns:
-            mapped["TNVED2"] = mapped["TNVED"].str[:2]
-            mapped["TNVED4"] = mapped["TNVED"].str[:4]
-            mapped["TNVED6"] = mapped["TNVED"].str[:6]
+    csv_files = sorted(FTS_DIR.glob("*.csv"))
+    if not csv_files:
+        logger.error(f"CSV-файлы не найдены в {FTS_DIR}")
+        return pd.DataFrame()
 
-        # STRANA — приведение к ISO2 если нужно (цифровой код)
-        if "STRANA" in mapped.columns:
-            mapped["STRANA"] = mapped["STRANA"].astype(str).str.strip().str.upper()
+    logger.info(f"Найдено файлов: {len(csv_files)}")
 
-        dfs.append(mapped)
-        logger.info(f"  Загружен {path.name}: {len(mapped)} строк")
+    if len(csv_files) > 1 and max_workers != 1:
+        # Файлы независимы и обрабатываются CPU-bound (regex, строки, to_numeric) — по процессу на файл
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_process_one, csv_files))
+    else:
+        results = [_process_one(path) for path in csv_files]
+    tables = [t for t in results if t is not None]
+    del results
 
-    if not dfs:
+    if not tables:
         return pd.DataFrame()
 
-    combined = pd.concat(dfs, ignore_index=True)
+    # concat_tables только сцепляет чанки без копирования; permissive — колонки, которых нет
+    # в части файлов, и словари category с разной шириной индексов. При to_pandas Arrow сводит
+    # словари файлов в один общий для каждой category-колонки и освобождает чанки по мере конвертации
+    combined_table = pa.concat_tables(tables, promote_options="permissive")
+    del tables
+    combined = combined_table.to_pandas(split_blocks=True, self_destruct=True)
+    del combined_table
 
     # PERIOD в datetime
     if "PERIOD" in combined.columns:
         combined["PERIOD"] = pd.to_datetime(combined["PERIOD"], errors="coerce")
 
-    # Удаление строк без ключевых полей
-    required = ["NAPR", "PERIOD", "STRANA", "TNVED", "STOIM"]
-    for r in required:
-        if r in combined.columns:
-            combined = combined.dropna(subset=[r])
-        else:
+    # Удаление строк без ключевых полей — один dropna (одна копия), а не по колонке
+    present = [r for r in FTS_REQUIRED_COLUMNS if r in combined.columns]
+    for r in FTS_REQUIRED_COLUMNS:
+        if r not in present:
             logger.warning(f"Колонка {r} отсутствует в итоговом датасете")
+    combined = combined.dropna(subset=present)
 
     return combined
 
@@ -193,13 +458,9 @@ def main():
     parser.add_argument("--tnved2", type=str, default=None, help="Фильтр по 2-значному коду ТН ВЭД (например, 27)")
     parser.add_argument("--tnved4", type=str, default=None, help="Фильтр по 4-значному коду ТН ВЭД (например, 2710); при указании переопределяет --tnved2")
     parser.add_argument("--output-dir", type=str, default=None, help=f"Папка для сохранения (по умолчанию: {OUTPUT_DIR})")
+    parser.add_argument("--force", action="store_true", help="Пересобрать Parquet, даже если он новее исходных CSV")
     args = parser.parse_args()
 
-    df = load_fts_csv_files()
-    if df.empty:
-        logger.error("Нет данных для сохранения.")
-        return
-
     tnved2_filter = None
     tnved4_filter = None
     if args.tnved4:
@@ -208,15 +469,6 @@ def main():
     elif args.tnved2:
         tnved2_filter = str(args.tnved2).strip().zfill(2)
 
-    if tnved2_filter is not None:
-        df = df[df["TNVED2"] == tnved2_filter]
-        if tnved4_filter is not None:
-            df = df[df["TNVED4"] == tnved4_filter]
-        logger.info(f"После фильтра по ТН ВЭД: {len(df)} строк")
-        if df.empty:
-            logger.error("Нет данных после фильтра по коду ТН ВЭД.")
-            return
-
     out_dir = Path(args.output_dir) if args.output_dir else OUTPUT_DIR
     out_dir.mkdir(parents=True, exist_ok=True)
     name = OUTPUT_BASENAME
@@ -225,9 +477,21 @@ def main():
     elif tnved2_filter is not None:
         name += f"_TNVED2_{tnved2_filter}"
     output_path = out_dir / f"{name}.parquet"
-    df.to_parquet(output_path, index=False)
-    logger.info(f"Сохранено {len(df)} строк в {output_path}")
 
+    if not args.force and _output_is_fresh(output_path):
+        logger.info(f"{output_path} новее исходных CSV — пересборка пропущена (--force для принудительной)")
+    else:
+        n_rows = write_fts_parquet(output_path, tnved2_filter, tnved4_filter)
+        if n_rows == 0:
+            if tnved2_filter is not None:
+                logger.error("Нет данных после фильтра по коду ТН ВЭД.")
+            else:
+                logger.error("Нет данных для сохранения.")
+            return
+        logger.info(f"Сохранено {n_rows} строк в {output_path}")
+
+    # Для сводки читаем из Parquet только нужные колонки
+    df = pd.read_parquet(output_path, columns=["PERIOD", "NAPR", "STRANA"])
     print("\n=== Сводка по данным ФТС ===")
     print(f"Строк: {len(df)}")
     print(f"Период: {df['PERIOD'].min()} — {df['PERIOD'].max()}")
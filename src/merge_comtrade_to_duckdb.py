@@ -2,10 +2,18 @@
 """
 Script to merge Comtrade parquet files into a single DuckDB database.
 Uses DuckDB's native parquet reading capabilities.
+
+By default db/comtrade.db is rebuilt from all files on every run. With --incremental an
+existing database only gets the rows of files it has not merged yet; a merged file whose
+mtime or size changed, or that was removed, still forces a full rebuild.
 """
 
+import argparse
 import logging
+import os
+import shutil
 from pathlib import Path
+from typing import Optional
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,80 +31,298 @@ def get_parquet_files(data_dir: Path) -> list:
     if not data_dir.exists():
         logger.warning(f"Data directory does not exist: {data_dir}")
         return []
-    files = sorted(data_dir.glob("*.parquet"))
-    return [str(f) for f in files]
+    # One directory read; DirEntry.is_file() uses the cached d_type instead of a stat per file
+    with os.scandir(data_dir) as entries:
+        return sorted(
+            entry.path for entry in entries
+            if entry.name.endswith(".parquet") and entry.is_file()
+        )
+
+# Columns of comtrade_data in table order; expressions for derived columns are in COMTRADE_SELECT_EXPRESSIONS
+COMTRADE_COLUMNS = [
+    "refPeriodId", "refYear", "refMonth", "period",
+    "reporterCode", "flowCode", "partnerCode", "partner2Code",
+    "classificationCode", "classificationSearchCode", "isOriginalClassification",
+    "cmdCode", "cmdDesc", "aggrLevel", "isLeaf", "customsCode",
+    "mosCode", "motCode", "qtyUnitCode", "qty",
+    "isQtyEstimated", "altQtyUnitCode", "altQtyUnitAbbr", "altQty",
+    "netWgt", "isNetWgtEstimated", "grossWgt", "isGrossWgtEstimated",
+    "cifvalue", "fobvalue", "primaryValue", "legacyEstimationFlag",
+    "isReported", "isAggregate",
+]
+
+COMTRADE_SELECT_EXPRESSIONS = {
+    # Narrow key columns for the group-by/aggregate scans: years and 3-digit M49 country codes
+    # fit in 2 bytes, months in 1 (source parquet stores them as INTEGER). cmdCode stays VARCHAR
+    # because of its leading zeros.
+    "refYear": "CAST(refYear AS USMALLINT) as refYear",
+    "refMonth": "CAST(refMonth AS UTINYINT) as refMonth",
+    "reporterCode": "CAST(reporterCode AS USMALLINT) as reporterCode",
+    "partnerCode": "CAST(partnerCode AS USMALLINT) as partnerCode",
+    # Convert period from YYYYMM format to DATE with integer arithmetic (no per-row string round trip)
+    "period": "MAKE_DATE(CAST(period AS INTEGER) // 100, CAST(period AS INTEGER) % 100, 1) as period",
+    # Reverse flowCode: M (Import from reporter's perspective) -> ЭК (Export from partner's perspective)
+    # X (Export from reporter's perspective) -> ИМ (Import from partner's perspective)
+    # Stored as the flow_t ENUM: a 1-byte code instead of a UTF-8 string per row
+    "flowCode": "CAST(CASE flowCode WHEN 'M' THEN 'ЭК' WHEN 'X' THEN 'ИМ' END AS flow_t) as flowCode",
+}
+
+# Columns not used by any downstream query; kept in comtrade_data only with --wide-columns.
+# cmdDesc goes to the comtrade_cmd_desc lookup table instead.
+WIDE_COLUMNS = [
+    "cmdDesc", "classificationSearchCode", "isOriginalClassification",
+    "altQtyUnitAbbr", "legacyEstimationFlag",
+]
+
+# Detailed HS6 rows from the Russian-partner perspective
+COMTRADE_FILTER = """
+            WHERE customsCode = 'C00' 
+              AND motCode = 0 
+              AND partner2Code = 0
+              -- cmdCode is VARCHAR with leading zeros ('010121'): the string range is checked against
+              -- row-group min/max stats (drops e.g. 'TOTAL'), LENGTH removes the 2/4-digit levels
+              AND cmdCode BETWEEN '000000' AND '999999'
+              AND LENGTH(cmdCode) = 6"""
+
+# Parquet export options: 122880 rows is DuckDB's own row group size, so each exported row group
+# maps to one table row group and carries min/max stats at the same granularity as the zone maps
+PARQUET_COPY_OPTIONS = "FORMAT PARQUET, COMPRESSION 'zstd', COMPRESSION_LEVEL 3, ROW_GROUP_SIZE 122880"
+
+# Columns in the WHERE clause of the merge query; DuckDB prunes row groups on their min/max statistics
+PUSHDOWN_FILTER_COLUMNS = ["customsCode", "motCode", "partner2Code", "cmdCode"]
+
+def check_filter_statistics(conn, file_paths: list) -> list:
+    """
+    Check that parquet row groups carry min/max statistics for the filter columns.
+    
+    Reads only the parquet footers. Files without statistics are still merged correctly,
+    but DuckDB cannot skip their row groups and has to decode every value of the filter columns.
+    
+    Returns:
+        List of (file_name, [columns without statistics]) tuples
+    """
+    missing = conn.execute("""
+        SELECT file_name, list(DISTINCT path_in_schema ORDER BY path_in_schema)
+        FROM parquet_metadata(?)
+        WHERE path_in_schema IN (SELECT unnest(?))
+          AND (stats_min_value IS NULL OR stats_max_value IS NULL)
+          AND stats_null_count IS DISTINCT FROM num_values
+        GROUP BY file_name
+        ORDER BY file_name
+    """, [file_paths, PUSHDOWN_FILTER_COLUMNS]).fetchall()
+    
+    if missing:
+        logger.warning(f"{len(missing)} parquet files lack min/max statistics for filter columns (no row-group pruning):")
+        for file_name, columns in missing[:5]:
+            logger.warning(f"  {Path(file_name).name}: {', '.join(columns)}")
+        logger.warning("Rewrite them with statistics enabled (pyarrow.parquet.write_table default) to speed up the merge")
+    return missing
+
+def configure_connection(conn) -> None:
+    """
+    Cache parquet footers for the connection: the statistics check, the merge query and the
+    comtrade_cmd_desc query read the same files, so their metadata is parsed once.
+    The progress bar is turned off: the script reports through logging and is usually run
+    unattended, where terminal redraws only clutter the captured output.
+    
+    Threads and memory_limit keep DuckDB's defaults (all cores, 80% of RAM). preserve_insertion_order
+    stays on: comtrade_data relies on its ORDER BY for zone-map pruning.
+    """
+    conn.execute("SET enable_progress_bar = false")
+    try:
+        conn.execute("SET parquet_metadata_cache = true")
+    except duckdb.Error:
+        # Older DuckDB releases name this setting enable_object_cache
+        conn.execute("SET enable_object_cache = true")
 
-def create_duckdb_database(parquet_files: list, db_path: Path) -> None:
+def get_new_files(conn, file_stats: dict, columns: list) -> Optional[list]:
+    """
+    Find the parquet files not yet merged into an existing database.
+    
+    Rows in comtrade_data are not tied to their source file, so only additions can be merged
+    incrementally: a changed or removed file, missing bookkeeping tables or a different column
+    set or column types (e.g. switching --wide-columns, a database built by an older version of
+    this script) require a full rebuild.
+    
+    Args:
+        conn: Connection to the existing database
+        file_stats: Mapping of resolved file path -> (st_mtime_ns, st_size) for the current input files
+        columns: Expected comtrade_data columns
+    
+    Returns:
+        List of new file paths (possibly empty), or None if the database must be rebuilt
+    """
+    tables = {row[0] for row in conn.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+    required_tables = {"comtrade_data", "_loaded_files"}
+    if "cmdDesc" not in columns:
+        required_tables.add("comtrade_cmd_desc")
+    if not required_tables <= tables:
+        logger.info("Existing database has no merge bookkeeping, rebuilding")
+        return None
+    
+    existing_columns = [row[:2] for row in conn.execute("DESCRIBE comtrade_data").fetchall()]
+    # Types the merge query would produce now (reads only the parquet footers)
+    expected_columns = [row[:2] for row in conn.execute(f"""
+        DESCRIBE SELECT {", ".join(COMTRADE_SELECT_EXPRESSIONS.get(column, column) for column in columns)}
+        FROM read_parquet(?, union_by_name = true)
+    """, [list(file_stats)]).fetchall()]
+    if existing_columns != expected_columns:
+        logger.info("Existing comtrade_data has a different column set or column types, rebuilding")
+        return None
+    
+    loaded_columns = {row[0] for row in conn.execute("DESCRIBE _loaded_files").fetchall()}
+    if "size" not in loaded_columns:
+        logger.info("Existing _loaded_files does not record file sizes, rebuilding")
+        return None
+    
+    loaded = {
+        path: (mtime, size)
+        for path, mtime, size in conn.execute("SELECT path, mtime, size FROM _loaded_files").fetchall()
+    }
+    stale = [path for path, stat in loaded.items() if file_stats.get(path) != stat]
+    if stale:
+        logger.info(f"{len(stale)} previously merged files changed or were removed (e.g. {Path(stale[0]).name}), rebuilding")
+        return None
+    
+    return [path for path in file_stats if path not in loaded]
+
+def format_trade_row(row: tuple) -> str:
+    """Format a (refYear, flowCode) or (flowCode) row of the summary query as one report line."""
+    flow_code, total_value, record_count, unique_reporters = row[2], row[6], row[7], row[8]
+    flow_name = "ЭКСПОРТ" if flow_code == 'ЭК' else "ИМПОРТ" if flow_code == 'ИМ' else f"FLOW_{flow_code}"
+    return f"{flow_name}: ${total_value:,.0f} ({record_count:,} records, {unique_reporters:,} reporters)"
+
+def create_duckdb_database(
+    parquet_files: list,
+    db_path: Optional[Path],
+    parquet_path: Optional[Path] = None,
+    parquet_dataset_path: Optional[Path] = None,
+    diagnostics: bool = True,
+    wide_columns: bool = False,
+    rebuild: bool = True,
+) -> None:
     """
     Create DuckDB database from parquet files.
     
     Args:
         parquet_files: List of paths to parquet files
-        db_path: Path to output DuckDB database file
+        db_path: Path to output DuckDB database file; None merges in an in-memory database
+            (for parquet-only output)
+        parquet_path: If set, also export the merged table to this parquet file
+        parquet_dataset_path: If set, also export the merged table to this directory as a
+            Hive-partitioned parquet dataset (refYear=YYYY/flowCode=XX/)
+        diagnostics: Run the duplicate/coverage/schema/statistics reports after the load
+        wide_columns: Keep WIDE_COLUMNS in comtrade_data instead of the narrow table
+            plus the comtrade_cmd_desc lookup. Always on without db_path: parquet-only
+            output has no database to hold the lookup, so cmdDesc stays in the rows
+        rebuild: Always rebuild db_path from all files; otherwise an existing database built
+            from a subset of the same files only gets the rows of the new files appended
     """
-    logger.info(f"Creating DuckDB database at {db_path}")
+    if not parquet_files:
+        raise ValueError("No valid parquet files to process!")
     
-    # Delete existing database file if it exists
-    if db_path.exists():
-        logger.info(f"Deleting existing database file: {db_path}")
-        db_path.unlink()
+    file_paths = [str(Path(file_path).resolve()) for file_path in parquet_files]
+    file_stats = {}
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        file_stats[file_path] = (stat.st_mtime_ns, stat.st_size)
+    # Parquet-only runs keep the wide columns: the comtrade_cmd_desc lookup would
+    # otherwise be dropped with the in-memory database
+    wide_columns = wide_columns or db_path is None
+    columns = COMTRADE_COLUMNS if wide_columns else [
+        column for column in COMTRADE_COLUMNS if column not in WIDE_COLUMNS
+    ]
     
-    # Connect to DuckDB
-    conn = duckdb.connect(str(db_path))
+    # Incremental update: reuse the existing database if every file merged into it is unchanged
+    conn = None
+    new_files = None
+    if db_path is not None and db_path.exists() and not rebuild:
+        conn = duckdb.connect(str(db_path))
+        try:
+            configure_connection(conn)
+            new_files = get_new_files(conn, file_stats, columns)
+        except Exception:
+            conn.close()
+            raise
+        if new_files is None:
+            conn.close()
+            conn = None
     
-    try:
-        # Create table from all parquet files
-        logger.info(f"Processing {len(parquet_files)} parquet files...")
-        
-        # Build the UNION ALL query for all parquet files, filtering for detailed HS6 level data
-        # Use DuckDB's safe parameter binding for file paths
-        union_queries = []
-        failed_files = []
-        
-        for file_path in parquet_files:
-            try:
-                # Use DuckDB's read_parquet with proper path handling
-                # DuckDB handles paths safely when using read_parquet function
-                file_path_str = str(Path(file_path).resolve())
-                union_queries.append(f"""
-                    SELECT 
-                        refPeriodId, refYear, refMonth, 
-                        -- Convert period from YYYYMM format to DATE
-                        CAST(STRPTIME(CAST(period AS VARCHAR), '%Y%m') AS DATE) as period,
-                        reporterCode, 
-                        -- Reverse flowCode: M (Import from reporter's perspective) -> ЭК (Export from partner's perspective)
-                        -- X (Export from reporter's perspective) -> ИМ (Import from partner's perspective)
-                        CASE flowCode WHEN 'M' THEN 'ЭК' WHEN 'X' THEN 'ИМ' END as flowCode,
-                        partnerCode, partner2Code, 
-                        classificationCode, classificationSearchCode, isOriginalClassification, 
-                        cmdCode, cmdDesc, aggrLevel, isLeaf, customsCode, 
-                        mosCode, motCode, qtyUnitCode, qty, 
-                        isQtyEstimated, altQtyUnitCode, altQtyUnitAbbr, altQty, 
-                        netWgt, isNetWgtEstimated, grossWgt, isGrossWgtEstimated, 
-                        cifvalue, fobvalue, primaryValue, legacyEstimationFlag, 
-                        isReported, isAggregate
-                    FROM read_parquet('{file_path_str.replace("'", "''")}') 
-                    WHERE customsCode = 'C00' 
-                      AND motCode = 0 
-                      AND partner2Code = 0
-                      AND LENGTH(CAST(cmdCode AS VARCHAR)) = 6
-                """)
-            except Exception as e:
-                logger.warning(f"Failed to process file {file_path}: {e}")
-                failed_files.append(file_path)
-                continue
-        
-        if not union_queries:
-            raise ValueError("No valid parquet files to process!")
-        
-        if failed_files:
-            logger.warning(f"Failed to process {len(failed_files)} files. Continuing with {len(union_queries)} files.")
+    if conn is None:
+        if db_path is not None:
+            logger.info(f"Creating DuckDB database at {db_path}")
+            
+            # Delete existing database file if it exists
+            if db_path.exists():
+                logger.info(f"Deleting existing database file: {db_path}")
+                db_path.unlink()
         
-        union_query = " UNION ALL ".join(union_queries)
-        create_query = f"CREATE TABLE comtrade_data AS {union_query}"
+        # Connect to DuckDB
+        conn = duckdb.connect(str(db_path) if db_path is not None else ":memory:")
+        configure_connection(conn)
+    
+    try:
+        load_paths = file_paths if new_files is None else new_files
+        if new_files is None:
+            logger.info(f"Processing {len(load_paths)} parquet files...")
+        else:
+            logger.info(f"Updating {db_path}: {len(load_paths)} new of {len(file_paths)} parquet files")
         
-        logger.info("Executing merge query with filters: customsCode = 'C00', motCode = 0, partner2Code = 0, cmdCode length = 6, flowCode reversed...")
-        conn.execute(create_query)
+        if load_paths:
+            # One read_parquet scan over the whole file list, filtering for detailed HS6 level data.
+            # The list is bound as a parameter, so DuckDB plans a single multi-file scan (parallel
+            # across files/row groups) instead of one UNION ALL branch per file. Only the listed
+            # columns are read, and the equality filters are pushed into the parquet reader.
+            check_filter_statistics(conn, load_paths)
+            select_query = f"""
+                SELECT 
+                    {", ".join(COMTRADE_SELECT_EXPRESSIONS.get(column, column) for column in columns)}
+                FROM read_parquet(?, union_by_name = true) 
+                {COMTRADE_FILTER}
+                -- Physical order instead of secondary indexes: DuckDB keeps min/max zone maps per
+                -- row group, so filters on year/month/commodity skip whole row groups
+                ORDER BY refYear, refMonth, cmdCode
+            """
+            # Commodity descriptions are one long string per code: keep them once per code
+            # instead of on every fact row (only cmdCode/cmdDesc are read for this)
+            cmd_desc_query = f"""
+                SELECT DISTINCT cmdCode, cmdDesc
+                FROM read_parquet(?, union_by_name = true) 
+                {COMTRADE_FILTER}
+            """
+            
+            # Data and bookkeeping are committed together, so a failed update leaves the
+            # database as it was
+            conn.begin()
+            logger.info("Executing merge query with filters: customsCode = 'C00', motCode = 0, partner2Code = 0, cmdCode length = 6, flowCode reversed...")
+            if new_files is None:
+                conn.execute("CREATE TYPE flow_t AS ENUM ('ИМ', 'ЭК')")
+                conn.execute(f"CREATE TABLE comtrade_data AS {select_query}", [load_paths])
+                if not wide_columns:
+                    conn.execute(
+                        f"CREATE TABLE comtrade_cmd_desc AS {cmd_desc_query} ORDER BY cmdCode, cmdDesc",
+                        [load_paths],
+                    )
+                if db_path is not None:
+                    conn.execute("CREATE TABLE _loaded_files (path VARCHAR, mtime BIGINT, size BIGINT)")
+            else:
+                # New rows are appended in their own sorted run (new files are usually new periods)
+                conn.execute(f"INSERT INTO comtrade_data {select_query}", [load_paths])
+                if not wide_columns:
+                    conn.execute(f"""
+                        INSERT INTO comtrade_cmd_desc
+                        {cmd_desc_query}
+                        EXCEPT SELECT cmdCode, cmdDesc FROM comtrade_cmd_desc
+                        ORDER BY cmdCode, cmdDesc
+                    """, [load_paths])
+            if db_path is not None:
+                conn.executemany(
+                    "INSERT INTO _loaded_files VALUES (?, ?, ?)",
+                    [[file_path, *file_stats[file_path]] for file_path in load_paths],
+                )
+            conn.commit()
+        else:
+            logger.info("No new parquet files since the last merge")
         
         # Get table info
         result = conn.execute("SELECT COUNT(*) as total_rows FROM comtrade_data").fetchone()
@@ -108,43 +334,86 @@ def create_duckdb_database(parquet_files: list, db_path: Path) -> None:
         
         logger.info(f"Total rows in DuckDB (HS6 level, Russian perspective): {row_count:,}")
         
+        if parquet_path is not None:
+            if parquet_path.exists():
+                logger.info(f"Deleting existing parquet file: {parquet_path}")
+                parquet_path.unlink()
+            conn.execute(
+                f"COPY comtrade_data TO ? ({PARQUET_COPY_OPTIONS})",
+                [str(parquet_path)],
+            )
+            logger.info(f"Exported comtrade_data to {parquet_path}")
+        
+        if parquet_dataset_path is not None:
+            if parquet_dataset_path.exists():
+                logger.info(f"Deleting existing parquet dataset: {parquet_dataset_path}")
+                shutil.rmtree(parquet_dataset_path)
+            # Readers filtering on year/flow (read_parquet(..., hive_partitioning = true)) open
+            # only the matching directories; row groups inside keep the refMonth/cmdCode order
+            conn.execute(
+                f"COPY comtrade_data TO ? ({PARQUET_COPY_OPTIONS}, PARTITION_BY (refYear, flowCode))",
+                [str(parquet_dataset_path)],
+            )
+            logger.info(f"Exported comtrade_data to {parquet_dataset_path} (partitioned by refYear, flowCode)")
+        
+        if not diagnostics:
+            return
+        
         # Check for potential duplicates and missing data
         logger.info("Checking for potential duplicates and data coverage...")
         
-        # Check for duplicates by key fields
+        # Check for duplicates by key fields: only the 5 largest groups are fetched (top-N, no full
+        # sort); the window count carries the total number of duplicate groups alongside them
         duplicate_check = conn.execute("""
             SELECT 
                 reporterCode, partnerCode, cmdCode, period, flowCode,
-                COUNT(*) as record_count
+                COUNT(*) as record_count,
+                COUNT(*) OVER () as duplicate_groups
             FROM comtrade_data
             GROUP BY reporterCode, partnerCode, cmdCode, period, flowCode
             HAVING COUNT(*) > 1
             ORDER BY record_count DESC
-            LIMIT 10
+            LIMIT 5
         """).fetchall()
         
         if duplicate_check:
-            logger.warning(f"Found {len(duplicate_check)} potential duplicate combinations!")
+            logger.warning(f"Found {duplicate_check[0][6]:,} potential duplicate combinations!")
             logger.warning("Sample duplicates:")
-            for row in duplicate_check[:5]:
+            for row in duplicate_check:
                 logger.warning(f"  Reporter: {row[0]}, Partner: {row[1]}, CMD: {row[2]}, Period: {row[3]}, Flow: {row[4]} - {row[5]} records")
         else:
             logger.info("No duplicates found - data is clean!")
         
-        # Check data coverage by isReported status
-        coverage_check = conn.execute("""
+        # Coverage, basic statistics and trade totals in one scan: each grouping set is one
+        # report; GROUPING() tells the sets apart (bit set = column rolled up in that row).
+        # Distinct counts are only logged, so HyperLogLog estimates (fixed-size sketch per group,
+        # ~1-2% error on large cardinalities) replace exact per-group hash sets
+        summary_rows = conn.execute("""
             SELECT 
-                isReported,
+                GROUPING(refYear, flowCode, isReported) as grouping_id,
+                refYear, flowCode, isReported,
                 COUNT(*) as record_count,
-                COUNT(DISTINCT reporterCode) as unique_reporters
+                approx_count_distinct(reporterCode) as unique_reporters,
+                SUM(primaryValue) FILTER (WHERE primaryValue > 0) as total_value,
+                COUNT(*) FILTER (WHERE primaryValue > 0) as trade_record_count,
+                approx_count_distinct(reporterCode) FILTER (WHERE primaryValue > 0) as trade_unique_reporters,
+                MIN(refYear) as min_year,
+                MAX(refYear) as max_year,
+                approx_count_distinct(partnerCode) as unique_partners,
+                approx_count_distinct(cmdCode) as unique_commodities
             FROM comtrade_data
-            GROUP BY isReported
+            GROUP BY GROUPING SETS ((isReported), (refYear, flowCode), (flowCode), ())
+            ORDER BY refYear, flowCode, isReported DESC
         """).fetchall()
+        coverage_check = [row for row in summary_rows if row[0] == 0b110]
+        yearly_trade = [row for row in summary_rows if row[0] == 0b001 and row[7] > 0]
+        total_trade = [row for row in summary_rows if row[0] == 0b101 and row[7] > 0]
+        stats = next(row for row in summary_rows if row[0] == 0b111)
         
         logger.info("Data coverage by isReported status:")
         for row in coverage_check:
-            status = "REPORTED" if row[0] else "ESTIMATED"
-            logger.info(f"  {status}: {row[1]:,} records from {row[2]:,} reporters")
+            status = "REPORTED" if row[3] else "ESTIMATED"
+            logger.info(f"  {status}: {row[4]:,} records from {row[5]:,} reporters")
         
         # Get column info
         columns_info = conn.execute("DESCRIBE comtrade_data").fetchall()
@@ -152,99 +421,38 @@ def create_duckdb_database(parquet_files: list, db_path: Path) -> None:
         for col in columns_info:
             logger.info(f"  {col[0]}: {col[1]}")
         
-        # Get sample data
-        sample_data = conn.execute("SELECT * FROM comtrade_data LIMIT 5").fetchall()
-        logger.info("Sample data:")
-        for row in sample_data:
-            logger.info(f"  {row}")
-        
-        # Create indexes for common query patterns based on Comtrade schema
-        logger.info("Creating indexes...")
-        indexes = [
-            ("idx_refYear", "refYear"),
-            ("idx_refMonth", "refMonth"),
-            ("idx_reporterCode", "reporterCode"),
-            ("idx_partnerCode", "partnerCode"),
-            ("idx_flowCode", "flowCode"),
-            ("idx_cmdCode", "cmdCode"),
-            ("idx_period", "period"),
-        ]
-        
-        created_indexes = 0
-        for idx_name, col_name in indexes:
-            try:
-                # Check if index already exists
-                conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_name} ON comtrade_data({col_name})")
-                created_indexes += 1
-            except Exception as e:
-                logger.warning(f"Could not create index {idx_name} on {col_name}: {e}")
-        
-        logger.info(f"Created {created_indexes} out of {len(indexes)} indexes")
+        # Sample rows box every column into Python objects; only fetch them when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            sample_data = conn.execute("SELECT * FROM comtrade_data LIMIT 5").fetchall()
+            logger.debug("Sample data:")
+            for row in sample_data:
+                logger.debug(f"  {row}")
         
-        # Get some basic statistics
+        # Basic statistics (from the summary scan above)
         logger.info("Getting basic statistics...")
-        stats = conn.execute("""
-            SELECT 
-                MIN(refYear) as min_year,
-                MAX(refYear) as max_year,
-                COUNT(DISTINCT reporterCode) as unique_reporters,
-                COUNT(DISTINCT partnerCode) as unique_partners,
-                COUNT(DISTINCT cmdCode) as unique_commodities
-            FROM comtrade_data
-        """).fetchone()
-        
-        if stats and stats[0] is not None:
-            logger.info(f"Year range: {stats[0]} - {stats[1]}")
-            logger.info(f"Unique reporters: {stats[2]:,}")
-            logger.info(f"Unique partners: {stats[3]:,}")
-            logger.info(f"Unique commodities: {stats[4]:,}")
+        if stats[9] is not None:
+            logger.info(f"Year range: {stats[9]} - {stats[10]}")
+            logger.info(f"Unique reporters: {stats[5]:,}")
+            logger.info(f"Unique partners: {stats[11]:,}")
+            logger.info(f"Unique commodities: {stats[12]:,}")
         else:
             logger.warning("Could not retrieve statistics - table may be empty")
         
-        # Get export and import sums by year
+        # Export and import sums by year (primaryValue > 0 only), then totals by flow;
+        # the whole report is emitted as one multi-line log record
         logger.info("Getting export and import sums by year...")
-        yearly_trade = conn.execute("""
-            SELECT 
-                refYear,
-                flowCode,
-                SUM(primaryValue) as total_value,
-                COUNT(*) as record_count,
-                COUNT(DISTINCT reporterCode) as unique_reporters
-            FROM comtrade_data
-            WHERE primaryValue IS NOT NULL AND primaryValue > 0
-            GROUP BY refYear, flowCode
-            ORDER BY refYear, flowCode
-        """).fetchall()
-        
-        logger.info("=== TRADE VALUES BY YEAR ===")
+        lines = ["=== TRADE VALUES BY YEAR ==="]
         current_year = None
         for row in yearly_trade:
-            year, flow_code, total_value, record_count, unique_reporters = row
+            year = row[1]
             if year != current_year:
-                logger.info(f"\nYear {year}:")
+                lines.append(f"\nYear {year}:")
                 current_year = year
-            
-            flow_name = "ЭКСПОРТ" if flow_code == 'ЭК' else "ИМПОРТ" if flow_code == 'ИМ' else f"FLOW_{flow_code}"
-            logger.info(f"  {flow_name}: ${total_value:,.0f} ({record_count:,} records, {unique_reporters:,} reporters)")
-        
-        # Get total export and import sums
-        total_trade = conn.execute("""
-            SELECT 
-                flowCode,
-                SUM(primaryValue) as total_value,
-                COUNT(*) as record_count,
-                COUNT(DISTINCT reporterCode) as unique_reporters
-            FROM comtrade_data
-            WHERE primaryValue IS NOT NULL AND primaryValue > 0
-            GROUP BY flowCode
-            ORDER BY flowCode
-        """).fetchall()
+            lines.append(f"  {format_trade_row(row)}")
         
-        logger.info("\n=== TOTAL TRADE VALUES ===")
-        for row in total_trade:
-            flow_code, total_value, record_count, unique_reporters = row
-            flow_name = "ЭКСПОРТ" if flow_code == 'ЭК' else "ИМПОРТ" if flow_code == 'ИМ' else f"FLOW_{flow_code}"
-            logger.info(f"{flow_name}: ${total_value:,.0f} ({record_count:,} records, {unique_reporters:,} reporters)")
+        lines.append("\n=== TOTAL TRADE VALUES ===")
+        lines.extend(format_trade_row(row) for row in total_trade)
+        logger.info("\n".join(lines))
         
     except Exception as e:
         logger.error(f"Error creating DuckDB database: {e}")
@@ -254,12 +462,48 @@ def create_duckdb_database(parquet_files: list, db_path: Path) -> None:
 
 def main():
     """Main function to orchestrate the merge and conversion process."""
+    parser = argparse.ArgumentParser(description="Merge Comtrade parquet files into DuckDB and/or a single parquet file")
+    parser.add_argument("--emit-duckdb", action="store_true", help="Write db/comtrade.db (default when no --emit-* flag is given)")
+    parser.add_argument("--emit-parquet", action="store_true", help="Write db/comtrade.parquet; alone, merges in memory without comtrade.db")
+    parser.add_argument(
+        "--emit-parquet-dataset",
+        action="store_true",
+        help="Write db/comtrade_parquet/ partitioned by refYear and flowCode; alone, merges in memory without comtrade.db",
+    )
+    parser.add_argument(
+        "--diagnostics",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Run post-load duplicate/coverage/statistics reports (default: on with --emit-duckdb, off for parquet-only)",
+    )
+    parser.add_argument(
+        "--wide-columns",
+        action="store_true",
+        help=(
+            "Keep cmdDesc and other unused source columns in comtrade_data (no comtrade_cmd_desc table); "
+            "always on for parquet-only output"
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Append only files not yet merged into db/comtrade.db instead of rebuilding it "
+            "(changed or removed files still force a rebuild)"
+        ),
+    )
+    args = parser.parse_args()
+    emit_duckdb = args.emit_duckdb or not (args.emit_parquet or args.emit_parquet_dataset)
+    diagnostics = emit_duckdb if args.diagnostics is None else args.diagnostics
+    
     # Define paths relative to script location
     script_dir = Path(__file__).resolve().parent
     project_root = script_dir.parent
     data_dir = project_root / "data_raw" / "comtrade_data"
     output_dir = project_root / "db"
     db_path = output_dir / "comtrade.db"
+    parquet_path = output_dir / "comtrade.parquet"
+    parquet_dataset_path = output_dir / "comtrade_parquet"
     
     # Create output directory if it doesn't exist
     output_dir.mkdir(exist_ok=True)
@@ -278,12 +522,27 @@ def main():
         logger.info(f"  {i+1}. {Path(file_path).name}")
     
     # Create DuckDB database
-    create_duckdb_database(parquet_files, db_path)
+    create_duckdb_database(
+        parquet_files,
+        db_path if emit_duckdb else None,
+        parquet_path=parquet_path if args.emit_parquet else None,
+        parquet_dataset_path=parquet_dataset_path if args.emit_parquet_dataset else None,
+        diagnostics=diagnostics,
+        wide_columns=args.wide_columns,
+        rebuild=not args.incremental,
+    )
     
     logger.info("Process completed successfully!")
-    logger.info(f"DuckDB database: {db_path}")
-    if db_path.exists():
-        logger.info(f"Database size: {db_path.stat().st_size / (1024*1024):.1f} MB")
+    if emit_duckdb:
+        logger.info(f"DuckDB database: {db_path}")
+        if db_path.exists():
+            logger.info(f"Database size: {db_path.stat().st_size / (1024*1024):.1f} MB")
+    if args.emit_parquet:
+        logger.info(f"Parquet file: {parquet_path}")
+        if parquet_path.exists():
+            logger.info(f"Parquet size: {parquet_path.stat().st_size / (1024*1024):.1f} MB")
+    if args.emit_parquet_dataset:
+        logger.info(f"Parquet dataset: {parquet_dataset_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -19,10 +19,13 @@ pipeline stages (discover -> load -> append -> merge -> save).
 
 import argparse
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import duckdb
+import numpy as np
 import pandas as pd
 
 from core.comtrade import load_and_transform_comtrade
@@ -49,6 +52,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Row order of unified_trade_data; applied by DuckDB while writing the table.
+MERGED_SORT_COLUMNS = ['PERIOD', 'STRANA', 'TNVED']
+
 
 def parse_merge_args(argv: List[str] = None):
     """Parse CLI arguments for the merge pipeline."""
@@ -94,6 +100,15 @@ def parse_merge_args(argv: List[str] = None):
         action='store_false',
         help="Do not load fizob_*.parquet files into the fizob_index table.",
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help=(
+            "Processes for loading national parquet files: 1 loads them sequentially "
+            "in this process (default), 0 uses one process per CPU."
+        ),
+    )
     parser.set_defaults(include_nowcast=True, include_fizob=True)
     return parser.parse_args(argv)
 
@@ -136,29 +151,62 @@ def discover_processed_files(data_processed_dir: Path):
     return regular_files, fizob_files
 
 
+def _load_national_file(file_path: Path, start_year: int = None) -> Optional[pd.DataFrame]:
+    """
+    Load, validate and normalize one national parquet file; None if it is rejected.
+
+    Module-level so it can be handed to ProcessPoolExecutor.
+    """
+    # load_and_validate_file already normalized TNVED and derived TNVED2..8
+    df = load_and_validate_file(file_path, start_year=start_year)
+    if df is None:
+        return None
+    if 'STRANA' in df.columns:
+        # Upper-case the few distinct country codes, not every row; missing
+        # values (code -1) pick the trailing None.
+        codes, raw_values = pd.factorize(df['STRANA'])
+        upper_values = np.append(raw_values.str.upper().to_numpy(dtype=object), None)
+        df['STRANA'] = upper_values[codes]
+    return df
+
+
 def load_national_datasets(
     regular_files: List[Path],
     excluded_countries_upper: List[str],
     start_year: int = None,
+    max_workers: Optional[int] = 1,
 ) -> Dict[str, pd.DataFrame]:
-    """Load, validate and normalize processed national parquet datasets."""
+    """
+    Load, validate and normalize processed national parquet datasets.
+
+    Files are loaded sequentially in the current process by default; a
+    process pool is opt-in (max_workers=None uses the CPU count, N > 1 caps
+    the pool size).
+    """
     national_datasets = {}
     if not regular_files:
         logger.warning("No regular national parquet files found in data_processed directory.")
         return national_datasets
 
+    files_to_load = []
     for file_path in regular_files:
         country_code = file_path.stem.replace('_full', '').upper()
         if country_code in excluded_countries_upper:
             logger.info(f"Skipping {file_path.name} as per --exclude-countries argument.")
             continue
+        files_to_load.append((country_code.lower(), file_path))
 
-        df = load_and_validate_file(file_path, start_year=start_year)
-        if df is not None:
-            df_processed = generate_derived_columns(df)
-            if 'STRANA' in df_processed.columns:
-                df_processed['STRANA'] = df_processed['STRANA'].str.upper()
-            national_datasets[country_code.lower()] = df_processed
+    file_paths = [file_path for _, file_path in files_to_load]
+    if len(file_paths) > 1 and max_workers != 1:
+        # Files are independent and the TNVED/schema passes are CPU-bound: one process per file
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_load_national_file, file_paths, repeat(start_year)))
+    else:
+        results = [_load_national_file(file_path, start_year) for file_path in file_paths]
+
+    for (source_name, _), df_processed in zip(files_to_load, results):
+        if df_processed is not None:
+            national_datasets[source_name] = df_processed
 
     return national_datasets
 
@@ -190,7 +238,7 @@ def append_national_data(
     national_datasets: Dict[str, pd.DataFrame],
 ) -> List[str]:
     """Append national datasets and return covered ISO country codes."""
-    national_countries_iso = []
+    national_countries_iso = set()
     for source_name, df in national_datasets.items():
         df['SOURCE'] = 'national'
         if 'TYPE' not in df.columns:
@@ -200,13 +248,11 @@ def append_national_data(
         all_dataframes.append(df)
 
         if 'STRANA' in df.columns and not df.empty:
-            unique_countries = df['STRANA'].dropna().unique()
-            for country in unique_countries:
-                country_upper = country.upper()
-                if country_upper not in national_countries_iso:
-                    national_countries_iso.append(country_upper)
+            national_countries_iso.update(
+                country.upper() for country in df['STRANA'].dropna().unique()
+            )
 
-    return national_countries_iso
+    return sorted(national_countries_iso)
 
 
 def append_comtrade_data(
@@ -227,7 +273,7 @@ def append_comtrade_data(
         logger.error(f"Comtrade database not found at {comtrade_db_path}. Cannot include Comtrade data.")
         return
 
-    countries_to_exclude_from_comtrade = list(set(national_countries_iso + excluded_countries_upper))
+    countries_to_exclude_from_comtrade = sorted(set(national_countries_iso + excluded_countries_upper))
     logger.info(f"Excluding countries from Comtrade data to avoid duplicates: {countries_to_exclude_from_comtrade}")
 
     comtrade_df = load_and_transform_comtrade(
@@ -240,8 +286,9 @@ def append_comtrade_data(
         return
 
     initial_comtrade_rows = len(comtrade_df)
-    indices_to_drop = comtrade_df[comtrade_df['STRANA'].isin(national_countries_iso)].index
-    comtrade_df.drop(indices_to_drop, inplace=True)
+    indices_to_drop = comtrade_df.index[comtrade_df['STRANA'].isin(national_countries_iso)]
+    if len(indices_to_drop) > 0:
+        comtrade_df.drop(indices_to_drop, inplace=True)
     filtered_rows = initial_comtrade_rows - len(comtrade_df)
     if filtered_rows > 0:
         logger.info(f"Filtered {filtered_rows:,} duplicate rows from Comtrade data that matched national countries.")
@@ -263,17 +310,20 @@ def build_merged_dataframe(
         return pd.DataFrame()
 
     merged_df = pd.concat(all_dataframes, ignore_index=True)
+    # concat copies every source frame; drop the references so the sources
+    # are freed before the sort/standardization passes instead of doubling
+    # the peak memory for the rest of the merge.
+    all_dataframes.clear()
 
     if excluded_countries_upper:
         initial_rows = len(merged_df)
-        indices_to_drop = merged_df[merged_df['STRANA'].isin(excluded_countries_upper)].index
-        merged_df.drop(indices_to_drop, inplace=True)
+        indices_to_drop = merged_df.index[merged_df['STRANA'].isin(excluded_countries_upper)]
+        if len(indices_to_drop) > 0:
+            merged_df.drop(indices_to_drop, inplace=True)
         excluded_rows = initial_rows - len(merged_df)
         if excluded_rows > 0:
             logger.info(f"Excluded {excluded_rows:,} rows for countries: {excluded_countries_upper}")
 
-    merged_df = merged_df.sort_values(['PERIOD', 'STRANA', 'TNVED'])
-
     initial_rows = len(merged_df)
     merged_df.dropna(subset=['NAPR'], inplace=True)
     null_napr_rows = initial_rows - len(merged_df)
@@ -289,40 +339,29 @@ def build_merged_dataframe(
     else:
         logger.error("Could not standardize EDIZM values due to mapping load failure.")
 
-    merged_df = add_tnved_columns(merged_df)
+    # Prefix columns are not modified after this point, so they stay
+    # categorical until the DuckDB write.
+    merged_df = add_tnved_columns(merged_df, categorical=True)
     return apply_special_edizm_cases(merged_df, logger)
 
 
-def save_fizob_index(fizob_index_rows: List[pd.DataFrame], output_db_path: Path) -> None:
-    """Save unified fizob_index table and computed view."""
+def save_fizob_index(fizob_index_rows: List[pd.DataFrame], conn: duckdb.DuckDBPyConnection) -> None:
+    """Save unified fizob_index table and computed view on an open connection."""
     if not fizob_index_rows:
         return
 
     logger.info("Saving unified fizob_index table...")
     fizob_index_df = pd.concat(fizob_index_rows, ignore_index=True)
-    conn = duckdb.connect(str(output_db_path))
     try:
-        chunk_size = 100000
-        first_chunk = fizob_index_df.iloc[:chunk_size]
-        conn.register('fizob_chunk_df', first_chunk)
+        # One CREATE TABLE AS over the registered frame, as in save_to_duckdb:
+        # no chunk slicing and no per-chunk progress logging.
+        conn.register('fizob_index_df', fizob_index_df)
         conn.execute("""
             CREATE OR REPLACE TABLE fizob_index AS
             SELECT STRANA, NAPR, CAST(PERIOD AS DATE) AS PERIOD, tn_level, tn_code, fizob, fizob_bp
-            FROM fizob_chunk_df
+            FROM fizob_index_df
         """)
-        conn.unregister('fizob_chunk_df')
-        logger.info(f"  ... created fizob_index and inserted first {len(first_chunk):,} rows")
-
-        for i in range(chunk_size, len(fizob_index_df), chunk_size):
-            chunk = fizob_index_df.iloc[i:i + chunk_size]
-            conn.register('fizob_chunk_df', chunk)
-            conn.execute("""
-                INSERT INTO fizob_index
-                SELECT STRANA, NAPR, CAST(PERIOD AS DATE) AS PERIOD, tn_level, tn_code, fizob, fizob_bp
-                FROM fizob_chunk_df
-            """)
-            conn.unregister('fizob_chunk_df')
-            logger.info(f"  ... inserted {i + len(chunk):,} / {len(fizob_index_df):,} rows")
+        conn.unregister('fizob_index_df')
 
         result = conn.execute("SELECT COUNT(*) FROM fizob_index").fetchone()
         logger.info(f"  ... saved {result[0]:,} rows to fizob_index")
@@ -337,20 +376,15 @@ def save_fizob_index(fizob_index_rows: List[pd.DataFrame], output_db_path: Path)
     except Exception as e:
         logger.error(f"Failed to save fizob_index: {e}")
         raise
-    finally:
-        conn.close()
 
 
-def create_reference_tables(output_db_path: Path, project_root: Path) -> None:
-    """Create DuckDB reference tables and convenience views."""
-    conn = duckdb.connect(str(output_db_path))
+def create_reference_tables(conn: duckdb.DuckDBPyConnection, project_root: Path) -> None:
+    """Create DuckDB reference tables and convenience views on an open connection."""
     try:
         save_reference_tables(conn, project_root)
     except Exception as e:
         logger.error(f"Failed to create reference tables: {e}")
         raise
-    finally:
-        conn.close()
 
 
 def log_merge_summary(merged_df: pd.DataFrame) -> None:
@@ -407,16 +441,44 @@ def log_merge_summary(merged_df: pd.DataFrame) -> None:
     else:
         logger.warning("TYPE column not found: sanity-check for fact/pred skipped.")
 
+    # Per-country counts and top-5 units per country are aggregated by DuckDB
+    # over the registered frame; only the aggregated rows come back to Python.
+    conn = duckdb.connect()
+    try:
+        conn.register('merged_df', merged_df)
+        country_rows = conn.execute("""
+            SELECT SOURCE, STRANA, COUNT(*) AS count
+            FROM merged_df
+            WHERE STRANA IS NOT NULL
+            GROUP BY SOURCE, STRANA
+            ORDER BY SOURCE, count DESC, STRANA
+        """).fetchall()
+        top_edizm_rows = conn.execute("""
+            SELECT STRANA, EDIZM, COUNT(*) AS count
+            FROM merged_df
+            WHERE STRANA IS NOT NULL AND EDIZM IS NOT NULL
+            GROUP BY STRANA, EDIZM
+            QUALIFY row_number() OVER (PARTITION BY STRANA ORDER BY count DESC, EDIZM) <= 5
+            ORDER BY STRANA, count DESC, EDIZM
+        """).fetchall()
+    finally:
+        conn.close()
+
     logger.info("Rows by country:")
-    logger.info(str(merged_df.groupby('SOURCE')['STRANA'].value_counts()))
+    current_source = None
+    for source, strana, count in country_rows:
+        if source != current_source:
+            logger.info(f"  Source: {source}")
+            current_source = source
+        logger.info(f"    - {strana}: {count:,} rows")
 
     logger.info("EDIZM counts by country:")
-    edizm_counts = merged_df.groupby(['STRANA', 'EDIZM']).size().reset_index(name='count')
-    edizm_counts = edizm_counts.sort_values(['STRANA', 'count'], ascending=[True, False])
-    for strana, group in edizm_counts.groupby('STRANA'):
-        logger.info(f"  Country: {strana}")
-        for _, row in group.head(5).iterrows():
-            logger.info(f"    - {row['EDIZM']}: {row['count']:,} rows")
+    current_strana = None
+    for strana, edizm, count in top_edizm_rows:
+        if strana != current_strana:
+            logger.info(f"  Country: {strana}")
+            current_strana = strana
+        logger.info(f"    - {edizm}: {count:,} rows")
 
 
 def run_merge_pipeline(args, paths: Dict[str, Path]) -> None:
@@ -429,6 +491,7 @@ def run_merge_pipeline(args, paths: Dict[str, Path]) -> None:
         regular_files,
         excluded_countries_upper,
         start_year=args.start_year,
+        max_workers=args.workers or None,
     )
     if args.include_fizob:
         fizob_index_rows = load_fizob_index_rows(fizob_files, start_year=args.start_year)
@@ -438,6 +501,7 @@ def run_merge_pipeline(args, paths: Dict[str, Path]) -> None:
 
     all_dataframes = []
     national_countries_iso = append_national_data(all_dataframes, national_datasets)
+    del national_datasets
     append_comtrade_data(
         all_dataframes,
         include_comtrade=args.include_comtrade,
@@ -468,9 +532,19 @@ def run_merge_pipeline(args, paths: Dict[str, Path]) -> None:
         logger.error("Aborting save: smoke checks failed. The existing DuckDB was NOT modified.")
         return
 
-    save_to_duckdb(merged_df, paths["output_db_path"])
-    save_fizob_index(fizob_index_rows, paths["output_db_path"])
-    create_reference_tables(paths["output_db_path"], paths["project_root"])
+    def write_auxiliary_tables(conn: duckdb.DuckDBPyConnection) -> None:
+        # fizob_index and the reference tables are written through the same
+        # build connection, so the database is opened once and replaced as a
+        # whole.
+        save_fizob_index(fizob_index_rows, conn)
+        create_reference_tables(conn, paths["project_root"])
+
+    save_to_duckdb(
+        merged_df,
+        paths["output_db_path"],
+        order_by=MERGED_SORT_COLUMNS,
+        post_write=write_auxiliary_tables,
+    )
 
     logger.info("Data merge completed. To process outliers, run: python src/outlier_detection.py")
     log_merge_summary(merged_df)
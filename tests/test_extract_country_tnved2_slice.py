@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Tests for extract_country_tnved2_slice (slice file layout and writers)."""
+
+import zipfile
+
+import duckdb
+import pytest
+
+pl = pytest.importorskip("polars")
+
+import extract_country_tnved2_slice as slicer
+
+
+def make_unified_db(db_path, rows):
+    """Create a minimal unified DB; the enriched view is a pass-through of the base table."""
+    conn = duckdb.connect(str(db_path))
+    conn.execute("""
+        CREATE TABLE unified_trade_data (
+            NAPR VARCHAR, PERIOD DATE, STRANA VARCHAR, TNVED VARCHAR,
+            TNVED2 VARCHAR, TNVED4 VARCHAR, TNVED6 VARCHAR, TNVED8 VARCHAR,
+            EDIZM VARCHAR, STOIM DOUBLE, NETTO DOUBLE, KOL DOUBLE
+        )
+    """)
+    for napr, period, strana, tnved, stoim in rows:
+        conn.execute(
+            "INSERT INTO unified_trade_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'КГ', ?, 1.0, 1.0)",
+            [napr, period, strana, tnved, tnved[:2], tnved[:4], tnved[:6], tnved[:8], stoim],
+        )
+    conn.execute("CREATE VIEW unified_trade_data_enriched AS SELECT * FROM unified_trade_data")
+    conn.close()
+
+
+def sheet_names(workbook_path):
+    """Sheet names of an .xlsx file, read from its workbook.xml."""
+    with zipfile.ZipFile(workbook_path) as archive:
+        workbook_xml = archive.read("xl/workbook.xml").decode("utf-8")
+    return [part.split('"', 1)[0] for part in workbook_xml.split('<sheet name="')[1:]]
+
+
+class TestExcelSliceLayout:
+    """A workbook only when there is more than one slice, in the filtered and streaming paths alike."""
+
+    @pytest.fixture(autouse=True)
+    def _needs_xlsxwriter(self):
+        pytest.importorskip("xlsxwriter")
+
+    def test_streaming_single_slice_gets_own_file(self, tmp_path):
+        db_path = tmp_path / "unified.duckdb"
+        make_unified_db(db_path, [
+            ("ИМ", "2021-01-01", "CN", "2710190000", 1.0),
+            ("ЭК", "2021-02-01", "CN", "2709000000", 2.0),
+        ])
+        out_dir = tmp_path / "out"
+
+        slicer.extract_slice(db_path, out_dir, output_format="excel")
+
+        assert sorted(p.name for p in out_dir.iterdir()) == ["CN_TNVED2_27.xlsx"]
+
+    def test_streaming_several_slices_share_workbook(self, tmp_path):
+        db_path = tmp_path / "unified.duckdb"
+        make_unified_db(db_path, [
+            ("ИМ", "2021-01-01", "CN", "2710190000", 1.0),
+            ("ИМ", "2021-01-01", "IN", "0101010000", 2.0),
+            ("ЭК", "2021-02-01", "CN", "8704210000", 3.0),
+        ])
+        out_dir = tmp_path / "out"
+
+        slicer.extract_slice(db_path, out_dir, output_format="excel")
+
+        assert sorted(p.name for p in out_dir.iterdir()) == [slicer._EXCEL_WORKBOOK_NAME]
+        assert sheet_names(out_dir / slicer._EXCEL_WORKBOOK_NAME) == [
+            "CN_TNVED2_27", "CN_TNVED2_87", "IN_TNVED2_01",
+        ]
+
+    def test_filtered_path_follows_same_rule(self, tmp_path):
+        db_path = tmp_path / "unified.duckdb"
+        make_unified_db(db_path, [
+            ("ИМ", "2021-01-01", "CN", "2710190000", 1.0),
+            ("ЭК", "2021-02-01", "CN", "8704210000", 3.0),
+            ("ИМ", "2021-01-01", "IN", "0101010000", 2.0),
+        ])
+
+        single_dir = tmp_path / "single"
+        slicer.extract_slice(db_path, single_dir, countries=["IN"], output_format="excel")
+        assert sorted(p.name for p in single_dir.iterdir()) == ["IN_TNVED2_01.xlsx"]
+
+        multi_dir = tmp_path / "multi"
+        slicer.extract_slice(db_path, multi_dir, countries=["CN"], output_format="excel")
+        assert sorted(p.name for p in multi_dir.iterdir()) == [slicer._EXCEL_WORKBOOK_NAME]
+        assert sheet_names(multi_dir / slicer._EXCEL_WORKBOOK_NAME) == ["CN_TNVED2_27", "CN_TNVED2_87"]
+
+
+class TestCsvOutput:
+    @pytest.mark.parametrize("filters", [{}, {"countries": ["CN"]}])
+    def test_period_keeps_datetime_csv_format(self, tmp_path, filters):
+        """PERIOD is written as before the .pl() fetch, in the filtered and the streaming path."""
+        db_path = tmp_path / "unified.duckdb"
+        make_unified_db(db_path, [("ИМ", "2021-01-01", "CN", "2710190000", 1.0)])
+        out_dir = tmp_path / "out"
+
+        slicer.extract_slice(db_path, out_dir, **filters)
+
+        lines = (out_dir / "CN_TNVED2_27.csv").read_text(encoding="utf-8").splitlines()
+        header = lines[0].split(",")
+        assert lines[1].split(",")[header.index("PERIOD")] == "2021-01-01T00:00:00.000000"
+
+
+class TestStreamingExtraction:
+    def test_slice_spanning_batch_boundary_is_one_complete_file(self, tmp_path, monkeypatch):
+        """Rows of one (STRANA, TNVED2) key split across Arrow batches are written to a single file."""
+        db_path = tmp_path / "unified.duckdb"
+        make_unified_db(db_path, [
+            ("ИМ", "2021-01-01", "CN", "0101010000", 1.0),
+            *[("ИМ", f"2021-{month:02d}-01", "CN", "2710190000", float(month)) for month in range(1, 6)],
+            ("ЭК", "2021-01-01", "IN", "2710190000", 9.0),
+        ])
+        # Batches of 2 rows: the five CN/27 rows (ordered rows 2-6) span three batches
+        monkeypatch.setattr(slicer, "_STREAM_BATCH_ROWS", 2)
+        out_dir = tmp_path / "out"
+
+        slicer.extract_slice(db_path, out_dir)
+
+        assert sorted(p.name for p in out_dir.iterdir()) == [
+            "CN_TNVED2_01.csv", "CN_TNVED2_27.csv", "IN_TNVED2_27.csv",
+        ]
+        cn_27 = pl.read_csv(out_dir / "CN_TNVED2_27.csv", infer_schema=False)
+        assert sorted(float(v) for v in cn_27["STOIM"]) == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert len(pl.read_csv(out_dir / "CN_TNVED2_01.csv", infer_schema=False)) == 1
+        assert len(pl.read_csv(out_dir / "IN_TNVED2_27.csv", infer_schema=False)) == 1
+
+
+class TestWriteSlices:
+    @pytest.mark.parametrize("output_format", ["csv", "parquet"])
+    def test_thread_pool_matches_sequential_writes(self, tmp_path, output_format):
+        """_write_slices (concurrent shards) writes the same files as one-by-one _write_slice calls."""
+        df = pl.DataFrame({
+            "STRANA": ["CN", "CN", "IN", "TR", "TR", "TR"],
+            "TNVED2": ["27", "27", "27", "87", "87", "01"],
+            "STOIM": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        })
+        ext = slicer._OUTPUT_FILE_EXT[output_format]
+        pooled_dir = tmp_path / "pooled"
+        serial_dir = tmp_path / "serial"
+        pooled_dir.mkdir()
+        serial_dir.mkdir()
+        keys = df.select("STRANA", "TNVED2").unique(maintain_order=True).rows()
+
+        def slices_for(out_dir):
+            return [
+                (
+                    df.lazy().filter((pl.col("STRANA") == strana) & (pl.col("TNVED2") == tnved2)),
+                    out_dir / f"{strana}_TNVED2_{tnved2}{ext}",
+                    0,
+                )
+                for strana, tnved2 in keys
+            ]
+
+        slicer._write_slices(slices_for(pooled_dir), output_format)
+        for lf_slice, output_path, _ in slices_for(serial_dir):
+            slicer._write_slice(lf_slice, output_path, output_format)
+
+        names = sorted(p.name for p in serial_dir.iterdir())
+        assert len(names) == len(keys)
+        assert sorted(p.name for p in pooled_dir.iterdir()) == names
+        read = pl.read_csv if output_format == "csv" else pl.read_parquet
+        for name in names:
+            assert read(pooled_dir / name).equals(read(serial_dir / name))
+
+
+class TestOriginalNames:
+    def test_without_country_loads_names_only_for_present_countries(self, tmp_path, monkeypatch):
+        """The DISTINCT STRANA pre-query uses the same filters, so TR/IN names are never loaded."""
+        db_path = tmp_path / "unified.duckdb"
+        make_unified_db(db_path, [
+            ("ИМ", "2021-01-01", "CN", "2710190000", 1.0),
+            ("ИМ", "2021-01-01", "IN", "0101010000", 2.0),
+            ("ЭК", "2021-02-01", "TR", "8704210000", 3.0),
+        ])
+        loaded = []
+
+        def fake_names(country_iso2, project_root):
+            loaded.append(country_iso2)
+            return {"27101900": f"name {country_iso2}"}
+
+        monkeypatch.setattr(slicer, "load_country_original_names", fake_names)
+        out_dir = tmp_path / "out"
+
+        slicer.extract_slice(db_path, out_dir, tnved2="27", project_root=tmp_path)
+
+        assert loaded == ["CN"]
+        result = pl.read_csv(out_dir / "CN_TNVED2_27.csv", infer_schema=False)
+        assert [c for c in result.columns if c.startswith("TNVED_NAME_ORIGINAL_")] == ["TNVED_NAME_ORIGINAL_CN"]
+        assert result["TNVED_NAME_ORIGINAL_CN"].to_list() == ["name CN"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
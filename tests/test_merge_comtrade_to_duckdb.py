@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Tests for merge_comtrade_to_duckdb: full builds and incremental appends."""
+
+import logging
+import os
+from urllib.parse import quote
+
+import duckdb
+import pandas as pd
+import pytest
+
+import merge_comtrade_to_duckdb as mc
+
+
+def write_comtrade_parquet(path, year, month, cmd_codes, flow="M", value=100.0):
+    """Write a small Comtrade extract with every source column; all rows pass COMTRADE_FILTER."""
+    n = len(cmd_codes)
+    df = pd.DataFrame({
+        "refPeriodId": [int(f"{year}{month:02d}01")] * n,
+        "refYear": [year] * n,
+        "refMonth": [month] * n,
+        "period": [f"{year}{month:02d}"] * n,
+        "reporterCode": [156] * n,
+        "flowCode": [flow] * n,
+        "partnerCode": [643] * n,
+        "partner2Code": [0] * n,
+        "classificationCode": ["H6"] * n,
+        "classificationSearchCode": ["HS"] * n,
+        "isOriginalClassification": [True] * n,
+        "cmdCode": cmd_codes,
+        "cmdDesc": [f"desc {code}" for code in cmd_codes],
+        "aggrLevel": [6] * n,
+        "isLeaf": [True] * n,
+        "customsCode": ["C00"] * n,
+        "mosCode": ["0"] * n,
+        "motCode": [0] * n,
+        "qtyUnitCode": [8] * n,
+        "qty": [1.0] * n,
+        "isQtyEstimated": [False] * n,
+        "altQtyUnitCode": [-1] * n,
+        "altQtyUnitAbbr": ["N/A"] * n,
+        "altQty": [0.0] * n,
+        "netWgt": [1.0] * n,
+        "isNetWgtEstimated": [False] * n,
+        "grossWgt": [1.0] * n,
+        "isGrossWgtEstimated": [False] * n,
+        "cifvalue": [value] * n,
+        "fobvalue": [value] * n,
+        "primaryValue": [value] * n,
+        "legacyEstimationFlag": [0] * n,
+        "isReported": [True] * n,
+        "isAggregate": [False] * n,
+    })
+    df.to_parquet(path, index=False)
+    return str(path)
+
+
+def table_rows(db_path, query, params=None):
+    conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+
+class TestIncrementalMerge:
+    """create_duckdb_database(rebuild=False) (--incremental) appends new files and rebuilds when a merged file changed."""
+
+    @pytest.fixture
+    def files(self, tmp_path):
+        data_dir = tmp_path / "comtrade_data"
+        data_dir.mkdir()
+        return [
+            write_comtrade_parquet(data_dir / "c2021_01.parquet", 2021, 1, ["010121", "270900"]),
+            write_comtrade_parquet(data_dir / "c2021_02.parquet", 2021, 2, ["870321"], flow="X"),
+        ]
+
+    def test_first_build_records_loaded_files(self, tmp_path, files):
+        db_path = tmp_path / "comtrade.db"
+
+        mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        assert table_rows(db_path, "SELECT COUNT(*) FROM comtrade_data") == [(3,)]
+        loaded = table_rows(db_path, "SELECT path, mtime, size FROM _loaded_files ORDER BY path")
+        assert loaded == [
+            (str(os.path.realpath(f)), os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in files
+        ]
+        assert table_rows(db_path, "SELECT COUNT(*) FROM comtrade_cmd_desc") == [(3,)]
+
+    def test_new_file_is_appended_only(self, tmp_path, files, caplog):
+        db_path = tmp_path / "comtrade.db"
+        mc.create_duckdb_database(files[:1], db_path, diagnostics=False, rebuild=False)
+
+        with caplog.at_level(logging.INFO, logger=mc.logger.name):
+            mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        assert f"Updating {db_path}: 1 new of 2 parquet files" in caplog.messages
+        assert not any("rebuilding" in message for message in caplog.messages)
+        assert table_rows(
+            db_path, "SELECT refMonth, flowCode, COUNT(*) FROM comtrade_data GROUP BY ALL ORDER BY refMonth"
+        ) == [(1, "ЭК", 2), (2, "ИМ", 1)]
+        assert table_rows(db_path, "SELECT COUNT(*) FROM _loaded_files") == [(2,)]
+        assert table_rows(db_path, "SELECT COUNT(*) FROM comtrade_cmd_desc") == [(3,)]
+
+    def test_unchanged_files_append_nothing(self, tmp_path, files, caplog):
+        db_path = tmp_path / "comtrade.db"
+        mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        with caplog.at_level(logging.INFO, logger=mc.logger.name):
+            mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        assert "No new parquet files since the last merge" in caplog.messages
+        assert table_rows(db_path, "SELECT COUNT(*) FROM comtrade_data") == [(3,)]
+
+    def test_modified_file_forces_rebuild(self, tmp_path, files, caplog):
+        db_path = tmp_path / "comtrade.db"
+        mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        # Rewritten in place with new values: its recorded mtime is now stale
+        write_comtrade_parquet(files[0], 2021, 1, ["010121", "270900"], value=500.0)
+        stat = os.stat(files[0])
+        os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        with caplog.at_level(logging.INFO, logger=mc.logger.name):
+            mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        assert any("changed or were removed" in message for message in caplog.messages)
+        assert table_rows(
+            db_path, "SELECT refMonth, SUM(primaryValue) FROM comtrade_data GROUP BY ALL ORDER BY refMonth"
+        ) == [(1, 1000.0), (2, 100.0)]
+        assert table_rows(
+            db_path, "SELECT mtime FROM _loaded_files WHERE path = ?", [os.path.realpath(files[0])]
+        ) == [(os.stat(files[0]).st_mtime_ns,)]
+
+    def test_same_mtime_different_size_forces_rebuild(self, tmp_path, files, caplog):
+        """A file re-downloaded with its old mtime preserved is still detected by its size."""
+        db_path = tmp_path / "comtrade.db"
+        mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        stat = os.stat(files[0])
+        write_comtrade_parquet(files[0], 2021, 1, ["010121", "270900", "870321"])
+        os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert os.stat(files[0]).st_size != stat.st_size
+
+        with caplog.at_level(logging.INFO, logger=mc.logger.name):
+            mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=False)
+
+        assert any("changed or were removed" in message for message in caplog.messages)
+        assert table_rows(db_path, "SELECT COUNT(*) FROM comtrade_data") == [(4,)]
+
+    def test_cli_rebuilds_by_default(self, tmp_path, files, monkeypatch):
+        """Without --incremental the CLI rebuilds; --incremental opts into appending."""
+        calls = []
+        monkeypatch.setattr(mc, "get_parquet_files", lambda data_dir: files)
+        monkeypatch.setattr(mc, "create_duckdb_database", lambda *args, **kwargs: calls.append(kwargs["rebuild"]))
+        monkeypatch.setattr(mc.Path, "mkdir", lambda self, **kwargs: None)
+
+        monkeypatch.setattr("sys.argv", ["merge_comtrade_to_duckdb.py"])
+        mc.main()
+        monkeypatch.setattr("sys.argv", ["merge_comtrade_to_duckdb.py", "--incremental"])
+        mc.main()
+
+        assert calls == [True, False]
+
+    def test_rebuild_ignores_existing_database(self, tmp_path, files, caplog):
+        db_path = tmp_path / "comtrade.db"
+        mc.create_duckdb_database(files[:1], db_path, diagnostics=False, rebuild=False)
+
+        with caplog.at_level(logging.INFO, logger=mc.logger.name):
+            mc.create_duckdb_database(files, db_path, diagnostics=False, rebuild=True)
+
+        assert f"Deleting existing database file: {db_path}" in caplog.messages
+        assert "Processing 2 parquet files..." in caplog.messages
+        assert table_rows(db_path, "SELECT COUNT(*) FROM comtrade_data") == [(3,)]
+        assert table_rows(db_path, "SELECT COUNT(*) FROM _loaded_files") == [(2,)]
+
+
+class TestParquetExport:
+    """--emit-parquet / --emit-parquet-dataset write the same rows as comtrade_data."""
+
+    def test_exports_round_trip_against_table(self, tmp_path):
+        data_dir = tmp_path / "comtrade_data"
+        data_dir.mkdir()
+        files = [
+            write_comtrade_parquet(data_dir / "c2021_01.parquet", 2021, 1, ["010121", "270900"]),
+            write_comtrade_parquet(data_dir / "c2022_02.parquet", 2022, 2, ["870321"], flow="X"),
+        ]
+        db_path = tmp_path / "comtrade.db"
+        parquet_path = tmp_path / "comtrade.parquet"
+        dataset_path = tmp_path / "comtrade_parquet"
+
+        mc.create_duckdb_database(
+            files, db_path, parquet_path=parquet_path, parquet_dataset_path=dataset_path, diagnostics=False,
+        )
+
+        # Cyrillic flowCode values are URL-encoded in the partition directory names
+        partitions = sorted(
+            str(path.relative_to(dataset_path)) for path in dataset_path.glob("refYear=*/flowCode=*")
+        )
+        assert partitions == [
+            f"refYear=2021/flowCode={quote('ЭК')}",
+            f"refYear=2022/flowCode={quote('ИМ')}",
+        ]
+
+        conn = duckdb.connect(str(db_path), read_only=True)
+        try:
+            columns = [row[0] for row in conn.execute("DESCRIBE comtrade_data").fetchall()]
+            # Partition columns come back as BIGINT/VARCHAR, so compare on text values
+            select_list = ", ".join(f"CAST({column} AS VARCHAR)" for column in columns)
+            order_by = "refYear, refMonth, cmdCode"
+            expected = conn.execute(f"SELECT {select_list} FROM comtrade_data ORDER BY {order_by}").fetchall()
+            single_file = conn.execute(
+                f"SELECT {select_list} FROM read_parquet(?) ORDER BY {order_by}", [str(parquet_path)]
+            ).fetchall()
+            dataset = conn.execute(
+                f"SELECT {select_list} FROM read_parquet(?, hive_partitioning = true) ORDER BY {order_by}",
+                [str(dataset_path / "**" / "*.parquet")],
+            ).fetchall()
+            decoded_partitions = conn.execute(
+                "SELECT DISTINCT refYear, flowCode FROM read_parquet(?, hive_partitioning = true) ORDER BY refYear",
+                [str(dataset_path / "**" / "*.parquet")],
+            ).fetchall()
+        finally:
+            conn.close()
+
+        assert len(expected) == 3
+        assert single_file == expected
+        assert dataset == expected
+        assert decoded_partitions == [(2021, "ЭК"), (2022, "ИМ")]
+
+    def test_parquet_only_export_keeps_wide_columns(self, tmp_path):
+        """Without a database file there is no comtrade_cmd_desc, so cmdDesc stays in the exported rows."""
+        data_dir = tmp_path / "comtrade_data"
+        data_dir.mkdir()
+        files = [write_comtrade_parquet(data_dir / "c2021_01.parquet", 2021, 1, ["010121", "270900"])]
+        parquet_path = tmp_path / "comtrade.parquet"
+
+        mc.create_duckdb_database(files, None, parquet_path=parquet_path, diagnostics=False)
+
+        exported = pd.read_parquet(parquet_path)
+        assert set(mc.WIDE_COLUMNS) <= set(exported.columns)
+        assert sorted(exported["cmdDesc"]) == ["desc 010121", "desc 270900"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -4,6 +4,7 @@ Tests for merge_processed_data.py module.
 """
 
 import pytest
+import logging
 import pandas as pd
 import numpy as np
 import tempfile
@@ -12,13 +13,17 @@ from unittest.mock import patch, MagicMock
 import duckdb
 
 from merge_processed_data import (
+    add_tnved_columns,
     apply_special_edizm_cases,
     validate_schema,
     generate_derived_columns,
+    load_and_validate_file,
     load_tnved_mapping,
     load_strana_mapping,
     load_hs4_labels,
     load_common_edizm_mapping,
+    load_and_transform_comtrade,
+    normalize_tnved_code,
     save_to_duckdb,
     save_reference_tables,
     smoke_check_merged_dataset,
@@ -26,8 +31,11 @@ from merge_processed_data import (
     standardize_edizm_columns,
     EXPECTED_SCHEMA
 )
+from core.comtrade import COMTRADE_TNVED_SQL
 from core.reference_tables import build_unified_trade_data_enriched_view_sql
 from pipelines.merge_pipeline import (
+    load_national_datasets,
+    log_merge_summary,
     parse_merge_args,
     resolve_merge_paths,
 )
@@ -121,6 +129,25 @@ class TestValidateSchema:
         })
         assert validate_schema(df, 'test.parquet') == False
 
+    def test_equivalent_data_types_accepted(self):
+        """Other datetime resolutions and string dtypes are not schema drift."""
+        df = pd.DataFrame({
+            'NAPR': pd.array(['ИМ', 'ЭК'], dtype='string'),
+            'PERIOD': pd.to_datetime(['2024-01-01', '2024-02-01']).astype('datetime64[us]'),
+            'STRANA': ['RU', 'CN'],
+            'TNVED': ['0101010000', '0202020000'],
+            'EDIZM': ['КГ', 'ШТ'],
+            'EDIZM_ISO': ['166', '796'],
+            'STOIM': [1000.0, 2000.0],
+            'NETTO': [500.0, 600.0],
+            'KOL': [10.0, 20.0],
+            'TNVED2': ['01', '02'],
+            'TNVED4': ['0101', '0202'],
+            'TNVED6': ['010101', '020202'],
+            'TNVED8': ['01010100', '02020200'],
+        })
+        assert validate_schema(df, 'test.parquet') == True
+
 
 class TestGenerateDerivedColumns:
     """Tests for generate_derived_columns function."""
@@ -553,6 +580,38 @@ class TestSaveToDuckDB:
         assert result[0] == 150000
         conn.close()
 
+    def test_order_by_sorts_rows_in_duckdb(self, tmp_path, sample_df):
+        """order_by sorts the stored rows without a pandas sort."""
+        df = sample_df.iloc[::-1].reset_index(drop=True)
+        output_path = tmp_path / "test_db.duckdb"
+        save_to_duckdb(df, output_path, order_by=['PERIOD', 'STRANA', 'TNVED'])
+
+        conn = duckdb.connect(str(output_path))
+        rows = conn.execute("SELECT STRANA FROM unified_trade_data").fetchall()
+        conn.close()
+
+        assert rows == [('RU',), ('CN',)]
+
+    def test_categorical_columns_saved_as_varchar(self, tmp_path, sample_df):
+        """Categorical TNVED prefixes are stored as VARCHAR, not ENUM."""
+        df = add_tnved_columns(sample_df, categorical=True)
+        assert isinstance(df['TNVED4'].dtype, pd.CategoricalDtype)
+
+        output_path = tmp_path / "test_db.duckdb"
+        save_to_duckdb(df, output_path)
+
+        conn = duckdb.connect(str(output_path))
+        types = dict(conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = 'unified_trade_data'"
+        ).fetchall())
+        rows = conn.execute("SELECT TNVED2, TNVED4 FROM unified_trade_data ORDER BY TNVED").fetchall()
+        conn.close()
+
+        assert types['TNVED4'] == 'VARCHAR'
+        assert types['PERIOD'] == 'DATE'
+        assert rows == [('01', '0101'), ('02', '0202')]
+
     # ------------------------------------------------------------------
     # Atomic write safety tests
     # ------------------------------------------------------------------
@@ -693,6 +752,57 @@ class TestIntegration:
         assert result[0] == 2
         conn.close()
 
+    @pytest.mark.parametrize("period_as_string", [False, True])
+    def test_load_and_validate_file_filters_start_year(self, tmp_path, period_as_string):
+        """start_year keeps only rows from that year on, whether PERIOD is typed or text."""
+        periods = ['2021-12-01', '2022-01-01', '2023-05-01']
+        df = pd.DataFrame({
+            'NAPR': ['ИМ', 'ЭК', 'ИМ'],
+            'PERIOD': periods if period_as_string else pd.to_datetime(periods),
+            'STRANA': ['CN', 'CN', 'CN'],
+            'TNVED': ['0101010000', '0202020000', '0303030000'],
+            'EDIZM': ['КГ', 'ШТ', 'КГ'],
+            'EDIZM_ISO': ['166', '796', '166'],
+            'STOIM': [1000.0, 2000.0, 3000.0],
+            'NETTO': [500.0, 600.0, 700.0],
+            'KOL': [10.0, 20.0, 30.0],
+        })
+        file_path = tmp_path / "cn_full.parquet"
+        df.to_parquet(file_path, index=False)
+
+        result = load_and_validate_file(file_path, start_year=2022)
+
+        assert result is not None
+        assert result['PERIOD'].dt.year.tolist() == [2022, 2023]
+        assert result['TNVED2'].tolist() == ['02', '03']
+
+    def test_load_national_datasets_pool_matches_serial(self, tmp_path):
+        """The opt-in process pool returns the same frames in the same source order as the default serial load."""
+        regular_files = []
+        for country, strana in (('tr', 'de'), ('cn', 'us'), ('in', 'jp')):
+            df = pd.DataFrame({
+                'NAPR': ['ИМ', 'ЭК'],
+                'PERIOD': pd.to_datetime(['2023-01-01', '2023-02-01']),
+                'STRANA': [strana, None],
+                'TNVED': ['0101010000', '8704'],
+                'EDIZM': ['КГ', 'ШТ'],
+                'EDIZM_ISO': ['166', '796'],
+                'STOIM': [1000.0, 2000.0],
+                'NETTO': [500.0, 600.0],
+                'KOL': [10.0, 20.0],
+            })
+            file_path = tmp_path / f"{country}_full.parquet"
+            df.to_parquet(file_path, index=False)
+            regular_files.append(file_path)
+
+        serial = load_national_datasets(regular_files, ['IN'])
+        pooled = load_national_datasets(regular_files, ['IN'], max_workers=2)
+
+        assert list(serial) == list(pooled) == ['tr', 'cn']
+        for source in serial:
+            pd.testing.assert_frame_equal(serial[source], pooled[source])
+        assert serial['tr']['STRANA'].tolist() == ['DE', None]
+
 
 class TestSmokeCheckMergedDataset:
     """Tests for smoke_check_merged_dataset — the final quality gate before DuckDB write."""
@@ -770,6 +880,155 @@ class TestSmokeCheckMergedDataset:
         assert result is False
 
 
+class TestLoadAndTransformComtrade:
+    """load_and_transform_comtrade on a small comtrade.db with its metadata lookups."""
+
+    @pytest.fixture
+    def comtrade_project(self, tmp_path):
+        """Project root with partner/unit lookups; returns a builder for comtrade.db."""
+        metadata_dir = tmp_path / "metadata"
+        metadata_dir.mkdir()
+        (metadata_dir / "comtrate-partnerAreas.json").write_text(json.dumps({'results': [
+            {'id': 156, 'PartnerCodeIsoAlpha2': 'CN'},
+            {'id': 699, 'PartnerCodeIsoAlpha2': 'in'},
+            {'id': 899, 'PartnerCodeIsoAlpha2': None},
+        ]}), encoding='utf-8')
+        (metadata_dir / "comtradte-QuantityUnits.json").write_text(json.dumps({'results': [
+            {'qtyCode': 5, 'qtyAbbr': 'u'},
+            {'qtyCode': 8, 'qtyAbbr': 'kg'},
+        ]}), encoding='utf-8')
+
+        def build(rows):
+            db_path = tmp_path / "comtrade.db"
+            conn = duckdb.connect(str(db_path))
+            conn.execute("""
+                CREATE TABLE comtrade_data (
+                    period DATE, refYear INTEGER, reporterCode INTEGER, flowCode VARCHAR,
+                    cmdCode VARCHAR, qtyUnitCode INTEGER, qty DOUBLE,
+                    altQtyUnitCode INTEGER, altQty DOUBLE, primaryValue DOUBLE, netWgt DOUBLE
+                )
+            """)
+            conn.executemany(
+                "INSERT INTO comtrade_data VALUES ('2023-01-01', 2023, ?, 'M', ?, ?, ?, ?, ?, 100.0, 50.0)",
+                rows,
+            )
+            conn.close()
+            return db_path
+
+        return tmp_path, build
+
+    def test_unit_selection(self, comtrade_project):
+        """Alt unit wins over kg; kg is the fallback; unmapped unit codes become 'N/A'."""
+        project_root, build = comtrade_project
+        db_path = build([
+            # reporterCode, cmdCode, qtyUnitCode, qty, altQtyUnitCode, altQty
+            (156, '870321', 8, 1500.0, 5, 3.0),     # alt unit present
+            (156, '270900', 8, 2000.0, None, None), # main unit kg only
+            (156, '010121', 99, 7.0, None, None),   # main unit code not in the lookup
+            (156, '030211', 8, 40.0, 77, 2.0),      # alt unit code not in the lookup
+        ])
+
+        result = load_and_transform_comtrade(db_path, project_root, exclude_countries=[])
+
+        by_code = result.set_index('TNVED6')
+        assert by_code.loc['870321', ['EDIZM', 'KOL']].tolist() == ['u', 3.0]
+        assert by_code.loc['270900', ['EDIZM', 'KOL']].tolist() == ['kg', 2000.0]
+        assert by_code.loc['010121', ['EDIZM', 'KOL']].tolist() == ['N/A', 7.0]
+        assert by_code.loc['030211', ['EDIZM', 'KOL']].tolist() == ['N/A', 2.0]
+        assert result['EDIZM_ISO'].isna().all()
+        assert set(result['NAPR']) == {'ЭК'}
+        assert list(result.columns) == [c for c in EXPECTED_SCHEMA if c in result.columns]
+
+    def test_sql_tnved_matches_normalize_tnved_code(self, comtrade_project):
+        """COMTRADE_TNVED_SQL (rpad in DuckDB) gives the same TNVED/TNVED2..8 as the Python rule."""
+        project_root, build = comtrade_project
+        codes = ['0101', '87032', ' 270900 ', '8703210000', '870321000099']
+        db_path = build([(156, code, 8, 1.0, None, None) for code in codes])
+
+        with duckdb.connect() as conn:
+            sql_codes = conn.execute(
+                f"SELECT {COMTRADE_TNVED_SQL} FROM unnest(?) AS t(cmdCode)", [codes]
+            ).fetchall()
+        assert [row[0] for row in sql_codes] == [normalize_tnved_code(code) for code in codes]
+
+        result = load_and_transform_comtrade(db_path, project_root, exclude_countries=[])
+
+        expected = pd.Series([normalize_tnved_code(code) for code in codes], name='TNVED')
+        pd.testing.assert_series_equal(result['TNVED'].reset_index(drop=True), expected)
+        for level in (2, 4, 6, 8):
+            assert (result[f'TNVED{level}'] == result['TNVED'].str[:level]).all()
+
+    def test_reporters_without_iso2_are_dropped(self, comtrade_project):
+        """Reporters missing from the partner lookup or without an ISO2 code are dropped; ISO2 is upper-cased."""
+        project_root, build = comtrade_project
+        db_path = build([
+            (156, '870321', 8, 1.0, None, None),
+            (699, '870321', 8, 1.0, None, None),  # ISO2 stored as 'in'
+            (899, '870321', 8, 1.0, None, None),  # no PartnerCodeIsoAlpha2
+            (111, '870321', 8, 1.0, None, None),  # not in the lookup at all
+        ])
+
+        result = load_and_transform_comtrade(db_path, project_root, exclude_countries=[])
+
+        assert sorted(result['STRANA']) == ['CN', 'IN']
+
+
+class TestLogMergeSummary:
+    """log_merge_summary: per-country aggregates computed in DuckDB over the merged frame."""
+
+    @pytest.fixture
+    def summary_df(self):
+        # CN: seven units, ШТ/Л tie at 2 rows (broken by name), one null unit
+        cn_units = ['КГ'] * 4 + ['М'] * 3 + ['ШТ'] * 2 + ['Л'] * 2 + ['Т', 'ПАР', None]
+        in_units = ['КГ', 'КГ', 'ШТ']
+        n_cn, n_in = len(cn_units), len(in_units)
+        # Plus one national row without a country: left out of both per-country blocks
+        return pd.DataFrame({
+            'STRANA': ['CN'] * n_cn + ['IN'] * n_in + [None],
+            'EDIZM': cn_units + in_units + ['КГ'],
+            'SOURCE': ['national'] * (n_cn - 2) + ['comtrade'] * 2 + ['comtrade'] * n_in + ['national'],
+            'PERIOD': pd.to_datetime(['2024-01-01'] * (n_cn + n_in + 1)),
+            'TYPE': ['fact'] * (n_cn + n_in + 1),
+        })
+
+    @staticmethod
+    def logged_block(caplog, header, next_header=None):
+        messages = caplog.messages
+        start = messages.index(header) + 1
+        end = messages.index(next_header) if next_header else len(messages)
+        return messages[start:end]
+
+    def test_logs_top5_edizm_per_country(self, summary_df, caplog):
+        with caplog.at_level(logging.INFO, logger='pipelines.merge_pipeline'):
+            log_merge_summary(summary_df)
+
+        assert self.logged_block(caplog, 'EDIZM counts by country:') == [
+            '  Country: CN',
+            '    - КГ: 4 rows',
+            '    - М: 3 rows',
+            '    - Л: 2 rows',
+            '    - ШТ: 2 rows',
+            '    - ПАР: 1 rows',
+            '  Country: IN',
+            '    - КГ: 2 rows',
+            '    - ШТ: 1 rows',
+        ]
+
+    def test_logs_country_counts_per_source(self, summary_df, caplog):
+        with caplog.at_level(logging.INFO, logger='pipelines.merge_pipeline'):
+            log_merge_summary(summary_df)
+
+        assert 'Unique countries: 2' in caplog.messages
+
+        assert self.logged_block(caplog, 'Rows by country:', 'EDIZM counts by country:') == [
+            '  Source: comtrade',
+            '    - IN: 3 rows',
+            '    - CN: 2 rows',
+            '  Source: national',
+            '    - CN: 12 rows',
+        ]
+
+
 class TestMergeCliPaths:
     """Tests for merge pipeline CLI path handling."""
 
@@ -778,6 +1037,10 @@ class TestMergeCliPaths:
 
         assert args.output_db_path == 'runs/test/final.duckdb'
 
+    def test_parse_workers_arg(self):
+        assert parse_merge_args([]).workers == 1
+        assert parse_merge_args(['--workers', '4']).workers == 4
+
     def test_resolve_output_db_path_default(self, tmp_path):
         paths = resolve_merge_paths(project_root=tmp_path)
 
@@ -366,6 +366,123 @@ class TestFtsCsvContract:
         df = load_fts_csv.load_fts_csv_files()
         assert set(df["NAPR"].unique()) == {"ИМ", "ЭК"}
 
+    def test_cp1251_body_with_ascii_header(self, tmp_path, monkeypatch):
+        """Encoding is detected from the data rows too: an ASCII header does not imply utf-8."""
+        (tmp_path / "2021-03.csv").write_bytes(
+            "NAPR;STRANA;TNVED;STOIM;NETTO;KOL;EDIZM\n"
+            "ИМ;CN;0101010000;5000.0;1000.0;5.0;КГ\n"
+            "ЭК;IN;8704210000;12000.0;8000.0;3.0;ШТ\n".encode("cp1251")
+        )
+        monkeypatch.setattr(load_fts_csv, "FTS_DIR", tmp_path)
+        df = load_fts_csv.load_fts_csv_files()
+        assert list(df["NAPR"]) == ["ИМ", "ЭК"]
+        assert list(df["EDIZM"]) == ["КГ", "ШТ"]
+
+    def test_empty_country_keeps_nan_token(self, tmp_path, monkeypatch):
+        """An empty STRANA becomes 'NAN' (as with the pandas reader), in memory and in Parquet."""
+        data_dir = tmp_path / "fts"
+        data_dir.mkdir()
+        (data_dir / "2021-04.csv").write_text(
+            "NAPR,STRANA,TNVED,STOIM,NETTO,KOL,EDIZM\n"
+            "IMPORT,,0101010000,5000.0,1000.0,5.0,КГ\n"
+            "EXPORT,in,8704210000,12000.0,8000.0,3.0,ШТ\n",
+            encoding="utf-8",
+        )
+        monkeypatch.setattr(load_fts_csv, "FTS_DIR", data_dir)
+        df = load_fts_csv.load_fts_csv_files()
+        assert list(df["STRANA"]) == ["NAN", "IN"]
+
+        output_path = tmp_path / "fts.parquet"
+        assert load_fts_csv.write_fts_parquet(output_path) == 2
+        assert list(pd.read_parquet(output_path)["STRANA"]) == ["NAN", "IN"]
+
+    def test_process_pool_matches_serial_load(self, tmp_path, monkeypatch):
+        """Parallel per-file loading returns the same rows in file order as the serial path."""
+        for name, napr in (("2021-01.csv", "IMPORT"), ("2021-02.csv", "EXPORT")):
+            (tmp_path / name).write_text(
+                "NAPR,STRANA,TNVED,STOIM,NETTO,KOL,EDIZM\n"
+                f"{napr},CN,0101010000,5000.0,1000.0,5.0,КГ\n",
+                encoding="utf-8",
+            )
+        monkeypatch.setattr(load_fts_csv, "FTS_DIR", tmp_path)
+        parallel = load_fts_csv.load_fts_csv_files(max_workers=2)
+        serial = load_fts_csv.load_fts_csv_files(max_workers=1)
+        pd.testing.assert_frame_equal(parallel, serial)
+        assert list(parallel["NAPR"]) == ["ИМ", "ЭК"]
+
+    def test_streaming_parquet_matches_in_memory_load(self, tmp_path, monkeypatch):
+        """write_fts_parquet (chunked, incremental) writes the same rows as load_fts_csv_files."""
+        data_dir = tmp_path / "fts"
+        data_dir.mkdir()
+        (data_dir / "2021-01.csv").write_text(
+            "NAPR,STRANA,TNVED,STOIM,NETTO,KOL,EDIZM\n"
+            "IMPORT,CN,0101010000,5000.0,1000.0,5.0,КГ\n"
+            "EXPORT,IN,2710190000,12000.0,8000.0,3.0,ШТ\n"
+            "EXPORT,IN,2710190000,,8000.0,3.0,ШТ\n",
+            encoding="utf-8",
+        )
+        monkeypatch.setattr(load_fts_csv, "FTS_DIR", data_dir)
+        monkeypatch.setattr(load_fts_csv, "CSV_BLOCK_SIZE", 64)
+        expected = load_fts_csv.load_fts_csv_files().reset_index(drop=True)
+
+        output_path = tmp_path / "fts.parquet"
+        assert load_fts_csv.write_fts_parquet(output_path) == len(expected) == 2
+        # In memory the low-cardinality columns are categorical; Parquet round-trips them as strings
+        expected = expected.astype({c: object for c in load_fts_csv.FTS_CATEGORICAL_COLUMNS})
+        pd.testing.assert_frame_equal(pd.read_parquet(output_path), expected)
+
+        filtered_path = tmp_path / "fts_27.parquet"
+        assert load_fts_csv.write_fts_parquet(filtered_path, tnved2_filter="27") == 1
+        assert list(pd.read_parquet(filtered_path)["TNVED4"]) == ["2710"]
+
+    def test_streaming_parquet_pool_matches_serial(self, tmp_path, monkeypatch):
+        """write_fts_parquet parses files in a process pool and writes them in file order."""
+        data_dir = tmp_path / "fts"
+        data_dir.mkdir()
+        for month, strana in ((1, "CN"), (2, "IN"), (3, "TR")):
+            (data_dir / f"2021-{month:02d}.csv").write_text(
+                "NAPR,STRANA,TNVED,STOIM,NETTO,KOL,EDIZM\n"
+                f"IMPORT,{strana},0101010000,5000.0,1000.0,5.0,КГ\n"
+                f"EXPORT,{strana},2710190000,12000.0,8000.0,3.0,ШТ\n",
+                encoding="utf-8",
+            )
+        monkeypatch.setattr(load_fts_csv, "FTS_DIR", data_dir)
+
+        pooled_path = tmp_path / "pooled.parquet"
+        serial_path = tmp_path / "serial.parquet"
+        assert load_fts_csv.write_fts_parquet(pooled_path, max_workers=2) == 6
+        assert load_fts_csv.write_fts_parquet(serial_path, max_workers=1) == 6
+        pooled = pd.read_parquet(pooled_path)
+        pd.testing.assert_frame_equal(pooled, pd.read_parquet(serial_path))
+        assert list(pooled["STRANA"]) == ["CN", "CN", "IN", "IN", "TR", "TR"]
+
+    def test_streaming_parquet_skips_file_malformed_partway(self, tmp_path, monkeypatch):
+        """A file that fails after some blocks were parsed leaves no rows in the Parquet."""
+        data_dir = tmp_path / "fts"
+        data_dir.mkdir()
+        (data_dir / "2021-01.csv").write_text(
+            "NAPR,STRANA,TNVED,STOIM,NETTO,KOL,EDIZM\n"
+            "IMPORT,CN,0101010000,5000.0,1000.0,5.0,КГ\n",
+            encoding="utf-8",
+        )
+        good_rows = "".join(f"EXPORT,IN,2710190000,{i}.0,8000.0,3.0,ШТ\n" for i in range(1, 20))
+        (data_dir / "2021-02.csv").write_text(
+            "NAPR,STRANA,TNVED,STOIM,NETTO,KOL,EDIZM\n"
+            + good_rows
+            + "EXPORT,IN,2710190000,1.0,8000.0,3.0,ШТ,extra,fields\n",
+            encoding="utf-8",
+        )
+        monkeypatch.setattr(load_fts_csv, "FTS_DIR", data_dir)
+        monkeypatch.setattr(load_fts_csv, "CSV_BLOCK_SIZE", 64)
+        # Arrow rejects the file when opening it; the pandas fallback then fails on a later chunk
+        monkeypatch.setattr(load_fts_csv, "PANDAS_CHUNK_ROWS", 5)
+
+        output_path = tmp_path / "fts.parquet"
+        assert load_fts_csv.write_fts_parquet(output_path) == 1
+        written = pd.read_parquet(output_path)
+        assert list(written["STRANA"]) == ["CN"]
+        assert written["PERIOD"].dt.month.tolist() == [1]
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])